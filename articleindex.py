@@ -0,0 +1,260 @@
+# articleindex.py
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from sentimentcache import normalize_text
+
+ARTICLE_INDEX_FILE = "data/article_index.db"
+
+# Query parameters that never change the page content
+TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref", "ref_src", "cmpid", "ocid"}
+
+
+def canonicalize_url(url):
+    """
+    Stable form of a URL: lower-case scheme/host, no default port, fragment,
+    tracking parameters or trailing slash, and sorted query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if parts.port and (scheme, parts.port) not in {("http", 80), ("https", 443)}:
+        host = f"{host}:{parts.port}"
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+                   if not k.lower().startswith("utm_") and k.lower() not in TRACKING_PARAMS)
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((scheme, host, path, urlencode(query), ""))
+
+
+def content_hash(text):
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class ArticleIndex:
+    """
+    Persistent record of fetched articles keyed by canonical URL: when they
+    were fetched and checked, their content hash and the HTTP validators
+    (ETag / Last-Modified) for conditional re-fetches.
+
+    What each consumer (a coin's collector, a corpus, ...) has already
+    processed is kept separately in `consumed`, so one consumer fetching a
+    shared page does not make it "unchanged" for the others.
+    """
+
+    def __init__(self, db_path=ARTICLE_INDEX_FILE):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(
+            self.db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.create_tables()
+
+    def create_tables(self):
+        c = self.conn.cursor()
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS articles (
+            canonical_url TEXT PRIMARY KEY,
+            url TEXT,
+            page_canonical TEXT,
+            fetched_at REAL,
+            checked_at REAL,
+            etag TEXT,
+            last_modified TEXT,
+            content_hash TEXT,
+            text_length INTEGER
+        )
+        """)
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS idx_articles_page_canonical ON articles(page_canonical)")
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS consumed (
+            consumer TEXT,
+            canonical_url TEXT,
+            content_hash TEXT,
+            consumed_at REAL,
+            PRIMARY KEY (consumer, canonical_url)
+        ) WITHOUT ROWID
+        """)
+        columns = {row[1] for row in c.execute("PRAGMA table_info(feed_cursors)")}
+        if columns and "consumer" not in columns:
+            # Cursors used to be global; they only bound how far back feeds
+            # are listed, so the old ones can simply be dropped
+            c.execute("DROP TABLE feed_cursors")
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS feed_cursors (
+            consumer TEXT,
+            feed_url TEXT,
+            last_published REAL,
+            checked_at REAL,
+            etag TEXT,
+            last_modified TEXT,
+            PRIMARY KEY (consumer, feed_url)
+        ) WITHOUT ROWID
+        """)
+        self.conn.commit()
+
+    def get(self, url):
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT url, page_canonical, fetched_at, checked_at, etag, last_modified, "
+                "content_hash, text_length FROM articles WHERE canonical_url = ?",
+                (canonicalize_url(url),)).fetchone()
+        if row is None:
+            return None
+        keys = ("url", "page_canonical", "fetched_at", "checked_at", "etag",
+                "last_modified", "content_hash", "text_length")
+        return dict(zip(keys, row))
+
+    def conditional_headers(self, url, consumer=None):
+        """
+        If-None-Match / If-Modified-Since for a previously fetched URL. With a
+        consumer, only when it has already processed the stored content (a
+        304 would otherwise hide content it never saw).
+        """
+        entry = self.get(url)
+        headers = {}
+        if consumer is not None and (
+                not entry or self.consumed_hash(consumer, url) != entry["content_hash"]):
+            return headers
+        if entry and entry["content_hash"]:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def record(self, url, text, etag=None, last_modified=None, page_canonical=None):
+        """
+        Store a fetched article. Returns True when the content is new or has
+        changed since the last fetch, False when it hashes the same.
+        """
+        digest = content_hash(text)
+        canonical = canonicalize_url(url)
+        page_canonical = canonicalize_url(page_canonical) if page_canonical else None
+        now = time.time()
+        with self._lock, self.conn:
+            row = self.conn.execute(
+                "SELECT content_hash FROM articles WHERE canonical_url = ?",
+                (canonical,)).fetchone()
+            self.conn.execute("""
+                INSERT INTO articles (canonical_url, url, page_canonical, fetched_at, checked_at,
+                                      etag, last_modified, content_hash, text_length)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (canonical_url) DO UPDATE SET
+                    url = excluded.url,
+                    page_canonical = COALESCE(excluded.page_canonical, page_canonical),
+                    fetched_at = excluded.fetched_at,
+                    checked_at = excluded.checked_at,
+                    etag = excluded.etag,
+                    last_modified = excluded.last_modified,
+                    content_hash = excluded.content_hash,
+                    text_length = excluded.text_length
+            """, (canonical, url, page_canonical, now, now, etag, last_modified,
+                  digest, len(text)))
+        return row is None or row[0] != digest
+
+    def touch(self, url):
+        """Mark a URL as re-checked (e.g. after a 304 Not Modified)."""
+        with self._lock, self.conn:
+            self.conn.execute("UPDATE articles SET checked_at = ? WHERE canonical_url = ?",
+                              (time.time(), canonicalize_url(url)))
+
+    # ------------------------------------------------------
+    # ✅ Per-consumer processed state
+    # ------------------------------------------------------
+    def consumed_hash(self, consumer, url):
+        """Content hash `consumer` last committed for `url`, or None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT content_hash FROM consumed WHERE consumer = ? AND canonical_url = ?",
+                (consumer, canonicalize_url(url))).fetchone()
+        return row[0] if row else None
+
+    def mark_consumed(self, consumer, items):
+        """Record [(url, content_hash)] as processed by `consumer`."""
+        now = time.time()
+        rows = [(consumer, canonicalize_url(url), digest, now) for url, digest in items]
+        if not rows:
+            return
+        with self._lock, self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO consumed VALUES (?, ?, ?, ?)", rows)
+
+    def filter_new(self, urls, consumer=None):
+        """
+        URLs not yet processed, matching canonical forms and page canonicals.
+        With a consumer, "processed" means committed by that consumer.
+        """
+        canonical = [canonicalize_url(u) for u in urls]
+        if not canonical:
+            return []
+        placeholders = ",".join("?" * len(canonical))
+        if consumer is not None:
+            with self._lock:
+                seen = {row[0] for row in self.conn.execute(
+                    f"SELECT canonical_url FROM consumed WHERE consumer = ? "
+                    f"AND canonical_url IN ({placeholders})", [consumer] + canonical)}
+            return [u for u, c in zip(urls, canonical) if c not in seen]
+        with self._lock:
+            seen = {row[0] for row in self.conn.execute(
+                f"SELECT canonical_url FROM articles WHERE content_hash IS NOT NULL "
+                f"AND canonical_url IN ({placeholders}) "
+                f"UNION SELECT page_canonical FROM articles "
+                f"WHERE page_canonical IN ({placeholders})",
+                canonical + canonical)}
+        return [u for u, c in zip(urls, canonical) if c not in seen]
+
+    # ------------------------------------------------------
+    # 📡 Feed cursors
+    # ------------------------------------------------------
+    def feed_cursor(self, consumer, feed_url):
+        """{"last_published", "checked_at", "etag", "last_modified"} or None."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT last_published, checked_at, etag, last_modified "
+                "FROM feed_cursors WHERE consumer = ? AND feed_url = ?",
+                (consumer, feed_url)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("last_published", "checked_at", "etag", "last_modified"), row))
+
+    def set_feed_cursor(self, consumer, feed_url, last_published=None, etag=None,
+                        last_modified=None):
+        """Record a feed check for `consumer`; the cursor only ever moves forward."""
+        with self._lock, self.conn:
+            self.conn.execute("""
+                INSERT INTO feed_cursors (consumer, feed_url, last_published, checked_at,
+                                          etag, last_modified)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (consumer, feed_url) DO UPDATE SET
+                    last_published = MAX(COALESCE(last_published, 0),
+                                         COALESCE(excluded.last_published, 0)),
+                    checked_at = excluded.checked_at,
+                    etag = COALESCE(excluded.etag, etag),
+                    last_modified = COALESCE(excluded.last_modified, last_modified)
+            """, (consumer, feed_url, last_published, time.time(), etag, last_modified))
+
+    def stats(self):
+        with self._lock:
+            count, = self.conn.execute("SELECT COUNT(*) FROM articles").fetchone()
+            feeds, = self.conn.execute("SELECT COUNT(*) FROM feed_cursors").fetchone()
+        return {"articles": count, "feeds": feeds}
+
+
+_default_index = None
+_default_pid = None
+
+
+def get_article_index() -> ArticleIndex:
+    """Process-wide shared ArticleIndex (re-created after a fork)."""
+    global _default_index, _default_pid
+    if _default_index is None or _default_pid != os.getpid():
+        _default_index = ArticleIndex()
+        _default_pid = os.getpid()
+    return _default_index
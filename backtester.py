@@ -0,0 +1,363 @@
+# backtester.py
+import argparse
+import os
+import sqlite3
+
+import numpy as np
+import pandas as pd
+
+import indicators
+from candlecache import get_candle_cache
+from database import DB_FILE
+
+# Same rules and levels as TechnicalAgent.analyze / CalculateAgent.calculate_prices
+DEFAULT_PARAMS = {
+    "ma_fast": 20,
+    "ma_slow": 50,
+    "rsi_period": 14,
+    "rsi_upper": 70,
+    "rsi_lower": 30,
+    "macd_fast": 12,
+    "macd_slow": 26,
+    "macd_signal": 9,
+    "risk_pct": 0.03,
+    "reward_pct": 0.05,
+    # Optional entry filters (off = current live rules)
+    "use_rsi_filter": False,
+    "use_macd_filter": False,
+}
+
+
+class FeatureCache:
+    """
+    Memoized indicator arrays for one close series. SMAs come from a single
+    prefix sum, so any window costs one vectorized subtraction.
+    """
+
+    def __init__(self, close):
+        self.close = np.asarray(close, dtype=float)
+        self._cumsum = np.concatenate([[0.0], np.cumsum(self.close)])
+        self._memo = {}
+
+    def sma(self, window):
+        key = ("sma", window)
+        if key not in self._memo:
+            out = np.full(len(self.close), np.nan)
+            if window <= len(self.close):
+                out[window - 1:] = (self._cumsum[window:] -
+                                    self._cumsum[:-window]) / window
+            self._memo[key] = out
+        return self._memo[key]
+
+    def rsi(self, period):
+        key = ("rsi", period)
+        if key not in self._memo:
+            self._memo[key] = indicators.rsi(self.close, period)
+        return self._memo[key]
+
+    def exit_index(self, high, low, max_hold):
+        key = ("exit_index", max_hold)
+        if key not in self._memo:
+            self._memo[key] = ExitIndex(high, low, max_hold)
+        return self._memo[key]
+
+    def macd(self, fast, slow, signal):
+        key = ("macd", fast, slow, signal)
+        if key not in self._memo:
+            self._memo[key] = indicators.macd(self.close, fast, slow, signal)
+        return self._memo[key]
+
+
+# ------------------------------------------------------
+# 🧮 Vectorized rules
+# ------------------------------------------------------
+def technical_bias(features, params):
+    """+1 BULLISH / -1 BEARISH / 0 NEUTRAL per bar (MA crossover, as in analyze())."""
+    diff = features.sma(params["ma_fast"]) - features.sma(params["ma_slow"])
+    return np.sign(np.nan_to_num(diff)).astype(int)
+
+
+def sentiment_codes(bar_ts, news_ts, news_codes, ttl_seconds):
+    """
+    Net stored sentiment per bar: sign of (positive - negative) articles
+    published in the `ttl_seconds` before each bar; 0 when there are none.
+    """
+    if len(news_ts) == 0:
+        return np.zeros(len(bar_ts), dtype=int)
+    order = np.argsort(news_ts)
+    news_ts = np.asarray(news_ts)[order]
+    cumulative = np.concatenate([[0], np.cumsum(np.asarray(news_codes)[order])])
+    hi = np.searchsorted(news_ts, bar_ts, side="right")
+    lo = np.searchsorted(news_ts, bar_ts - ttl_seconds, side="right")
+    return np.sign(cumulative[hi] - cumulative[lo]).astype(int)
+
+
+def decide(bias, sentiment, features, params):
+    """
+    Vectorized DecisionAgent.combine_signals: +1 LONG, -1 SHORT, 0 HOLD.
+    `sentiment` of None means technical-only (sentiment always agrees).
+    """
+    if sentiment is None:
+        action = bias.copy()
+    else:
+        agree = (bias != 0) & (bias == sentiment)
+        action = np.where(agree, bias, np.where(bias == 0, sentiment, 0))
+
+    if params.get("use_rsi_filter"):
+        rsi = features.rsi(params["rsi_period"])
+        action = np.where((action == 1) & (rsi > params["rsi_upper"]), 0, action)
+        action = np.where((action == -1) & (rsi < params["rsi_lower"]), 0, action)
+    if params.get("use_macd_filter"):
+        macd, signal = features.macd(
+            params["macd_fast"], params["macd_slow"], params["macd_signal"])
+        momentum = np.sign(np.nan_to_num(macd - signal))
+        action = np.where(action == momentum, action, 0)
+    return action
+
+
+class ExitIndex:
+    """
+    Sparse tables of range minima over low and -high, so "first bar within
+    the next max_hold bars that touches a level" is answered for every
+    candidate entry at once in O(log max_hold) vectorized steps. Built once
+    per price series and reusable for any stop/target percentages.
+    """
+
+    def __init__(self, high, low, max_hold):
+        self.max_hold = max_hold
+        self.n = len(low)
+        self.levels = max(1, int(max_hold).bit_length())
+        pad = np.full(max_hold + 1, np.inf)
+        self.low_tables = self._build(np.concatenate([low, pad]))
+        self.neg_high_tables = self._build(np.concatenate([-high, pad]))
+
+    def _build(self, values):
+        tables = [values]
+        for k in range(1, self.levels):
+            prev, half = tables[-1], 1 << (k - 1)
+            tables.append(np.minimum(prev, np.concatenate([prev[half:], np.full(half, np.inf)])))
+        return tables
+
+    def _first_at_or_below(self, tables, start, threshold):
+        """Offset of the first bar in [start, start+max_hold) with value <= threshold, else -1."""
+        end = start + self.max_hold
+        pos = start.copy()
+        for k in reversed(range(self.levels)):
+            step = 1 << k
+            skip = (pos + step <= end) & (tables[k][np.minimum(pos, len(tables[k]) - 1)] > threshold)
+            pos = np.where(skip, pos + step, pos)
+        hit = (pos < end) & (tables[0][np.minimum(pos, len(tables[0]) - 1)] <= threshold)
+        return np.where(hit, pos - start, -1)
+
+    def first_low_at_or_below(self, start, level):
+        return self._first_at_or_below(self.low_tables, start, level)
+
+    def first_high_at_or_above(self, start, level):
+        return self._first_at_or_below(self.neg_high_tables, start, -level)
+
+
+def simulate(high, low, close, action, risk_pct, reward_pct, max_hold=240, fee=0.001,
+             exit_index=None):
+    """
+    Enter at the close of every bar with a LONG/SHORT action while flat, exit
+    at the stop/target level of the first bar that touches it (stop wins
+    ties) or at the close after `max_hold` bars. Exit bars for all candidate
+    entries come from one vectorized ExitIndex query; only the chain of
+    taken trades is walked. Returns a DataFrame of trades.
+    """
+    n = len(close)
+    candidates = np.flatnonzero(action[:-1] != 0)
+    if len(candidates) == 0:
+        return pd.DataFrame(columns=["entry_bar", "exit_bar", "side", "entry",
+                                     "exit", "return", "reason"])
+    if exit_index is None or exit_index.max_hold != max_hold or exit_index.n != n:
+        exit_index = ExitIndex(high, low, max_hold)
+
+    side = action[candidates]
+    entry = close[candidates]
+    is_long = side == 1
+    stop = np.where(is_long, entry * (1 - risk_pct), entry * (1 + risk_pct))
+    target = np.where(is_long, entry * (1 + reward_pct), entry * (1 - reward_pct))
+
+    start = candidates + 1
+    first_stop = np.where(is_long, exit_index.first_low_at_or_below(start, stop),
+                          exit_index.first_high_at_or_above(start, stop))
+    first_target = np.where(is_long, exit_index.first_high_at_or_above(start, target),
+                            exit_index.first_low_at_or_below(start, target))
+
+    never = max_hold + 1
+    first_stop = np.where(first_stop < 0, never, first_stop)
+    first_target = np.where(first_target < 0, never, first_target)
+    offset = np.minimum(first_stop, first_target)
+
+    timed_out = offset == never
+    exit_bar = np.where(timed_out, np.minimum(candidates + max_hold, n - 1),
+                        candidates + 1 + offset)
+    exit_price = np.where(first_stop <= first_target, stop, target)
+    exit_price = np.where(timed_out, close[exit_bar], exit_price)
+    reason = np.where(timed_out, "time", np.where(first_stop <= first_target, "stop", "target"))
+
+    # Walk only the taken trades: next entry is the first candidate after an exit
+    taken = []
+    k = 0
+    while k < len(candidates):
+        taken.append(k)
+        k = np.searchsorted(candidates, exit_bar[k], side="right")
+    taken = np.array(taken)
+
+    side = side[taken]
+    entry = entry[taken]
+    exit_price = exit_price[taken]
+    returns = np.where(side == 1, exit_price / entry - 1,
+                       1 - exit_price / entry) - 2 * fee
+    return pd.DataFrame({
+        "entry_bar": candidates[taken],
+        "exit_bar": exit_bar[taken],
+        "side": np.where(side == 1, "LONG", "SHORT"),
+        "entry": entry,
+        "exit": exit_price,
+        "return": returns,
+        "reason": reason[taken],
+    })
+
+
+def summarize(trades):
+    """Trade count, win rate, compounded return and max drawdown of a trade list."""
+    if trades.empty:
+        return {"trades": 0, "win_rate": 0.0, "total_return": 0.0,
+                "avg_return": 0.0, "max_drawdown": 0.0, "profit_factor": 0.0}
+    returns = trades["return"].to_numpy()
+    equity = np.cumprod(1 + returns)
+    peak = np.maximum.accumulate(np.concatenate([[1.0], equity]))[1:]
+    gains = returns[returns > 0].sum()
+    losses = -returns[returns < 0].sum()
+    return {
+        "trades": len(returns),
+        "win_rate": float((returns > 0).mean()),
+        "total_return": float(equity[-1] - 1),
+        "avg_return": float(returns.mean()),
+        "max_drawdown": float((equity / peak - 1).min()),
+        "profit_factor": float(gains / losses) if losses else float("inf"),
+    }
+
+
+class Backtester:
+    """
+    Replays cached candles and stored news sentiment through the live
+    LONG/SHORT/HOLD rules and the 3%/5% stop/target levels.
+    """
+
+    def __init__(self, timeframe="1h", period="730d", params=None, mode="stored",
+                 db_path=DB_FILE, sentiment_ttl_hours=24, max_hold=240, fee=0.001,
+                 candle_cache=None, debug=False):
+        self.timeframe = timeframe
+        self.period = period
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.mode = mode
+        self.db_path = db_path
+        self.sentiment_ttl = sentiment_ttl_hours * 3600
+        self.max_hold = max_hold
+        self.fee = fee
+        self.candle_cache = candle_cache or get_candle_cache()
+        self.debug = debug
+
+    @staticmethod
+    def ticker(coin):
+        coin = coin.strip().upper().split("-")[0]
+        for suffix in ("USDT", "USD"):
+            if coin.endswith(suffix):
+                coin = coin[: -len(suffix)]
+        return f"{coin}-USD"
+
+    def load_prices(self, coins):
+        frames = self.candle_cache.get_many(
+            [self.ticker(c) for c in coins], self.timeframe, self.period)
+        return {c: frames[self.ticker(c)] for c in coins}
+
+    def load_sentiment(self, coin):
+        """(timestamps, codes) of stored news rows for a coin."""
+        if self.mode != "stored" or not os.path.exists(self.db_path):
+            return np.array([], dtype=np.int64), np.array([], dtype=int)
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = conn.execute(
+                "SELECT date, sentiment FROM news_analysis WHERE coin = ?",
+                (coin.upper(),)).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return np.array([], dtype=np.int64), np.array([], dtype=int)
+        dates = pd.to_datetime([r[0] for r in rows], utc=True, errors="coerce")
+        codes = np.array([1 if str(r[1]).lower() == "positive" else
+                          -1 if str(r[1]).lower() == "negative" else 0 for r in rows])
+        valid = ~dates.isna()
+        return dates[valid].asi8 // 10**9, codes[valid]
+
+    def run_coin(self, coin, frame, params=None, features=None, sentiment=None):
+        """Backtest one coin; returns (metrics dict, trades DataFrame)."""
+        params = {**self.params, **(params or {})}
+        if frame is None or frame.empty:
+            return {"coin": coin, "bars": 0, **summarize(pd.DataFrame())}, pd.DataFrame()
+
+        close = frame["Close"].to_numpy(dtype=float)
+        features = features or FeatureCache(close)
+        if self.mode == "stored" and sentiment is None:
+            news_ts, news_codes = self.load_sentiment(coin)
+            sentiment = sentiment_codes(
+                frame.index.asi8 // 10**9, news_ts, news_codes, self.sentiment_ttl)
+
+        action = decide(technical_bias(features, params),
+                        sentiment if self.mode == "stored" else None,
+                        features, params)
+        high = frame["High"].to_numpy(dtype=float)
+        low = frame["Low"].to_numpy(dtype=float)
+        trades = simulate(high, low, close, action, params["risk_pct"], params["reward_pct"],
+                          self.max_hold, self.fee,
+                          features.exit_index(high, low, self.max_hold))
+        if not trades.empty:
+            trades.insert(0, "coin", coin)
+            trades["entry_time"] = frame.index[trades["entry_bar"].to_numpy()]
+            trades["exit_time"] = frame.index[trades["exit_bar"].to_numpy()]
+        return {"coin": coin, "bars": len(close), **summarize(trades)}, trades
+
+    def run(self, coins):
+        """Backtest every coin; returns (summary DataFrame, all trades)."""
+        frames = self.load_prices(coins)
+        rows, all_trades = [], []
+        for coin in coins:
+            metrics, trades = self.run_coin(coin, frames.get(coin))
+            rows.append(metrics)
+            if not trades.empty:
+                all_trades.append(trades)
+            if self.debug:
+                print(f"📈 {coin}: {metrics['trades']} trades, "
+                      f"return {metrics['total_return']*100:.2f}%, "
+                      f"max DD {metrics['max_drawdown']*100:.2f}%")
+        trades = pd.concat(all_trades, ignore_index=True) if all_trades else pd.DataFrame()
+        return pd.DataFrame(rows), trades
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Backtest the technical + sentiment rules on cached history")
+    parser.add_argument("--coins", nargs="+", default=["BTC", "ETH", "BNB", "SOL", "ADA"])
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--period", default="730d")
+    parser.add_argument("--mode", choices=["stored", "technical"], default="stored",
+                        help="'stored' combines stored news sentiment; 'technical' uses MA bias alone")
+    parser.add_argument("--max-hold", type=int, default=240,
+                        help="Close a trade after this many bars")
+    parser.add_argument("--fee", type=float, default=0.001, help="Fee per side")
+    parser.add_argument("--debug", action="store_true")
+    args = parser.parse_args()
+
+    backtester = Backtester(timeframe=args.timeframe, period=args.period, mode=args.mode,
+                            max_hold=args.max_hold, fee=args.fee, debug=args.debug)
+    summary, trades = backtester.run(args.coins)
+    print(summary.to_string(index=False))
+
+    os.makedirs("reports", exist_ok=True)
+    summary.to_csv("reports/backtest_results.csv", index=False)
+    if not trades.empty:
+        trades.to_csv("reports/backtest_trades.csv", index=False)
+    print("📄 Results saved to reports/backtest_results.csv")
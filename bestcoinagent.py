@@ -1,43 +1,60 @@
 # bestcoinagent.py
-from loadfinbertmodel import load_finbert
+import indicators
+from calculates import CalculateAgent
 from decisionagent import DecisionAgent
 from technicalagent import TechnicalAgent
-from newscollector import NewsCollector
+from newscorpus import NewsCorpus
+from sentimentcache import get_sentiment_cache
 
 
 class BestCoinAgent:
-    def __init__(self, timeframe="4h", debug=False):
+    """
+    Ranks a fixed coin list by technical bias plus shared news sentiment.
+    Levels follow FindBestAgent: live price as "current", fixed 3%/5%
+    stop/target, volatility-scaled stops only with `vol_stops`.
+    """
+
+    def __init__(self, timeframe="4h", debug=False, portfolio_value=0.0, vol_stops=False):
         self.timeframe = timeframe
         self.debug = debug
-        self.model, self.tokenizer = load_finbert()
-        self.decision_agent = DecisionAgent(self.model, self.tokenizer)
+        self.portfolio_value = portfolio_value
+        self.vol_stops = vol_stops
+        self.decision_agent = DecisionAgent(cache=get_sentiment_cache())
         self.tech_agent = TechnicalAgent()
-        self.news_collector = NewsCollector()
+        self.trade_calc = CalculateAgent(portfolio_value)
         self.coins = ["BTC", "ETH", "BNB", "SOL", "ADA"]
+        self.news_corpus = NewsCorpus(self.coins, debug=debug)
 
     def run(self):
         print(
             f"🔍 Scanning {len(self.coins)} coins for the best trading opportunity ({self.timeframe})...\n")
 
+        # Technical for every coin from one grouped download
+        technical, closes, columns = self.tech_agent.analyze_batch(
+            self.coins, self.timeframe, return_panel=True)
+
+        # News for every coin from one pass over the unique sources;
+        # each article is classified once and shared by the coins it mentions
+        self.news_corpus.collect()
+        news_scores = self.news_corpus.score(self.decision_agent)
+
         results = []
         for coin in self.coins:
             print(f"🧩 Analyzing {coin}...")
 
             # Technical
-            tech_bias, tech_strength, tf = self.tech_agent.analyze(
-                coin, self.timeframe)
+            tech_bias, tech_strength, tf, _ = technical[coin]
 
             # News
-            news_texts = self.news_collector.collect(coin)
-            if not news_texts:
+            sentiments = news_scores.get(coin, [])
+            if not sentiments:
                 sentiment, sentiment_score = "NEUTRAL", 0.0
             else:
                 combined_score = 0
-                for text in news_texts.values():
-                    s, sc = self.decision_agent.analyze_sentiment(text)
-                    combined_score += sc if s == "POSITIVE" else -sc
+                for _, s, sc in sentiments:
+                    combined_score += sc if s == "positive" else -sc
                 sentiment = "POSITIVE" if combined_score > 0 else "NEGATIVE"
-                sentiment_score = abs(combined_score / len(news_texts))
+                sentiment_score = abs(combined_score / len(sentiments))
 
             # Combine
             total_score = (tech_strength + sentiment_score) / 2
@@ -53,12 +70,35 @@ class BestCoinAgent:
                 "timeframe": tf
             })
 
+        # Levels and sizes for every candidate in one pass at live prices;
+        # the panel's last close only stands in for coins missing from the snapshot
+        coins = [r["coin"] for r in results]
+        cols = [columns.get(c) for c in coins]
+        have = [c for c in cols if c is not None]
+        last_close = dict(zip(have, closes[-1, have])) if have else {}
+        live = self.trade_calc.latest_prices(coins)
+        table = {
+            "coin": coins,
+            "action": [r["action"] for r in results],
+            "confidence": [r["score"] for r in results],
+            "current_price": [live[coin] or last_close.get(col, float("nan"))
+                              for coin, col in zip(coins, cols)],
+        }
+        if self.vol_stops:
+            vol = dict(zip(have, indicators.volatility(closes[:, have])[-1])) if have else {}
+            table["volatility"] = [vol.get(c, float("nan")) for c in cols]
+        levels = self.trade_calc.calculate_batch(table)
+        for r, row in zip(results, levels.itertuples(index=False)):
+            r.update(entry=row.entry_price, exit=row.exit_price,
+                     stop=row.stop_loss, size=row.size)
+
         # Sort & display
         results.sort(key=lambda x: x["score"], reverse=True)
         print("\n🏆 Best Coins for Trading:")
         for r in results[:5]:
             print(
-                f" - {r['coin']}: {r['action']} ({r['tech_bias']}, {r['sentiment']}) — score={r['score']:.2f}")
+                f" - {r['coin']}: {r['action']} ({r['tech_bias']}, {r['sentiment']}) — score={r['score']:.2f}"
+                f" | entry={r['entry']} exit={r['exit']} stop={r['stop']} size={r['size']}")
 
         best = results[0]
         print(
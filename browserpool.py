@@ -0,0 +1,137 @@
+# browserpool.py
+import asyncio
+import atexit
+import os
+import threading
+
+# Resource types never needed to read a results page
+BLOCKED_RESOURCES = {"image", "font", "media"}
+
+
+class BrowserPool:
+    """
+    One headless browser per process, started on first use and kept alive.
+    Playwright objects are bound to the event loop that created them, so the
+    pool owns a dedicated loop on a background thread; callers in any thread
+    or event loop submit work to it. At most `max_pages` pages load at once
+    and are reused between fetches.
+    """
+
+    def __init__(self, max_pages=4, headless=True, browser="firefox",
+                 blocked_resources=BLOCKED_RESOURCES):
+        self.max_pages = max_pages
+        self.headless = headless
+        self.browser_name = browser
+        self.blocked_resources = set(blocked_resources)
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_forever, name="browser-pool", daemon=True)
+        self._thread.start()
+        self._start_lock = None
+        self._playwright = None
+        self._browser = None
+        self._context = None
+        self._slots = None
+        self._idle_pages = []
+        self.fetches = 0
+
+    # ------------------------------------------------------
+    # 🧵 Runs on the pool's loop
+    # ------------------------------------------------------
+    async def _block(self, route):
+        if route.request.resource_type in self.blocked_resources:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    async def _ensure_started(self):
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._context is not None:
+                return
+            from playwright.async_api import async_playwright
+
+            self._playwright = await async_playwright().start()
+            launcher = getattr(self._playwright, self.browser_name)
+            self._browser = await launcher.launch(headless=self.headless)
+            self._context = await self._browser.new_context()
+            if self.blocked_resources:
+                await self._context.route("**/*", self._block)
+            self._slots = asyncio.Semaphore(self.max_pages)
+
+    async def fetch_async(self, url, timeout=60000):
+        """Rendered HTML of `url`. Must run on the pool's loop (see submit)."""
+        await self._ensure_started()
+        async with self._slots:
+            page = self._idle_pages.pop() if self._idle_pages else await self._context.new_page()
+            try:
+                await page.goto(url, timeout=timeout, wait_until="domcontentloaded")
+                content = await page.content()
+            except Exception:
+                # Don't hand a page in an unknown state to the next caller
+                try:
+                    await page.close()
+                except Exception:
+                    pass
+                raise
+            self._idle_pages.append(page)
+            self.fetches += 1
+            return content
+
+    async def _close(self):
+        if self._browser is not None:
+            await self._browser.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+        self._browser = self._context = self._playwright = None
+        self._idle_pages = []
+
+    # ------------------------------------------------------
+    # 🔌 Entry points for any thread / event loop
+    # ------------------------------------------------------
+    def submit(self, coro):
+        """Schedule a coroutine on the pool's loop; returns a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    async def fetch_in_loop(self, url, timeout=60000):
+        """Await a fetch from another event loop."""
+        return await asyncio.wrap_future(self.submit(self.fetch_async(url, timeout)))
+
+    def fetch(self, url, timeout=60000):
+        return self.submit(self.fetch_async(url, timeout)).result()
+
+    def fetch_many(self, urls, timeout=60000):
+        """HTML for every URL (an Exception in place of failures), in input order."""
+        async def gather():
+            return await asyncio.gather(
+                *(self.fetch_async(url, timeout) for url in urls), return_exceptions=True)
+        return self.submit(gather()).result()
+
+    def close(self):
+        if not self._thread.is_alive():
+            return
+        try:
+            self.submit(self._close()).result(timeout=30)
+        except Exception as e:
+            print(f"⚠️ Failed to close browser cleanly: {e}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+
+
+_default_pool = None
+_default_pid = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool() -> BrowserPool:
+    """Process-wide shared BrowserPool (re-created after a fork)."""
+    global _default_pool, _default_pid
+    with _pool_lock:
+        if _default_pool is None or _default_pid != os.getpid():
+            _default_pool = BrowserPool(
+                max_pages=int(os.environ.get("SARVA_BROWSER_PAGES", 4)))
+            _default_pid = os.getpid()
+            atexit.register(_default_pool.close)
+    return _default_pool
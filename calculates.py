@@ -1,6 +1,8 @@
-import yfinance as yf
 import numpy as np
+import pandas as pd
 from datetime import datetime
+from candlecache import get_candle_cache
+from pricefetcher import get_price_service
 
 
 class CalculateAgent:
@@ -9,19 +11,26 @@ class CalculateAgent:
     entry price, exit price, and stop loss, based on technical bias and action.
     """
 
-    def __init__(self, portfolio_value: float):
+    def __init__(self, portfolio_value: float, candle_cache=None, price_service=None):
         self.portfolio_value = portfolio_value
+        self.candle_cache = candle_cache or get_candle_cache()
+        self.price_service = price_service or get_price_service()
 
     def fetch_price(self, coin: str):
         """
         Fetches the most recent price for the given coin symbol.
+        Reads the shared Binance snapshot first and only falls back to the
+        hourly candles for coins Binance does not list.
         """
         try:
             # Normalize ticker: remove duplicates and ensure proper format
             coin = self._normalize_ticker(coin)
+            price = self.price_service.get(coin)
+            if price:
+                return price
+
             ticker = f"{coin}-USD"
-            data = yf.download(ticker, period="7d",
-                               interval="1h", progress=False)
+            data = self.candle_cache.get(ticker, "1h", "7d")
 
             if data.empty:
                 print(f"⚠️ No data found for {ticker}")
@@ -32,6 +41,27 @@ class CalculateAgent:
             print(f"⚠️ Failed to fetch price for {coin}: {e}")
             return None
 
+    def prefetch_prices(self, coins):
+        """
+        Refreshes the price snapshot once and warms the hourly candle cache
+        (grouped downloads) for coins missing from it, so subsequent
+        fetch_price() calls are served locally.
+        """
+        coins = [self._normalize_ticker(c) for c in coins]
+        prices = self.price_service.get_many(coins)
+        tickers = [f"{c}-USD" for c in coins if not prices.get(c)]
+        if not tickers:
+            return
+        try:
+            self.candle_cache.get_many(tickers, "1h", "7d")
+        except Exception as e:
+            print(f"⚠️ Failed to prefetch prices: {e}")
+
+    def latest_prices(self, coins):
+        """{coin: price or None} for many coins from one price snapshot."""
+        prices = self.price_service.get_many([self._normalize_ticker(c) for c in coins])
+        return {c: prices.get(self._normalize_ticker(c)) for c in coins}
+
     def _normalize_ticker(self, coin: str) -> str:
         """
         Cleans up the ticker format (e.g. removes duplicate suffixes or invalid endings).
@@ -57,15 +87,18 @@ class CalculateAgent:
         Calculates trade prices based on the action and coin data.
         Returns (entry_price, exit_price, stop_loss, current_price)
         """
-        current_price = self.fetch_price(coin)
+        return self.levels(self.fetch_price(coin), action)
+
+    @staticmethod
+    def levels(current_price, action: str, risk_pct=0.03, reward_pct=0.05):
+        """
+        Trade prices for an already fetched price, so one price can serve
+        every action. Returns (entry_price, exit_price, stop_loss, current_price)
+        """
         if current_price is None or current_price <= 0:
             # Return flat dummy values so code won't break
             return 0, 0, 0, 0
 
-        # Risk/reward assumptions
-        risk_pct = 0.03
-        reward_pct = 0.05
-
         if action.upper() == "LONG":
             entry_price = current_price
             stop_loss = current_price * (1 - risk_pct)
@@ -103,6 +136,64 @@ class CalculateAgent:
 
         return round(size, 2)
 
+    def calculate_batch(self, table, risk_pct=0.03, reward_pct=0.05, vol_multiplier=2.0,
+                        min_risk_pct=0.005, max_risk_pct=0.2):
+        """
+        Trade levels and sizes for a whole candidate set at once.
+
+        `table` is a DataFrame (or list of dicts) with columns coin, action,
+        confidence and optionally current_price and volatility (per-bar
+        return std, e.g. indicators.volatility on candles the caller already
+        has). Missing prices are filled from one price snapshot.
+
+        Without volatility the stop/target sit at the fixed risk_pct /
+        reward_pct used by calculate_prices(). With it the stop distance is
+        vol_multiplier * volatility (clipped to [min_risk_pct, max_risk_pct]),
+        the target keeps the same reward/risk ratio, and the size is scaled
+        down so a stop-out risks no more than it would at risk_pct.
+
+        Returns a copy of the table with entry_price, exit_price, stop_loss,
+        current_price, risk_pct and size columns.
+        """
+        df = pd.DataFrame(table).copy()
+        if df.empty:
+            return df.assign(entry_price=[], exit_price=[], stop_loss=[],
+                             current_price=[], risk_pct=[], size=[])
+
+        if "current_price" not in df:
+            df["current_price"] = np.nan
+        missing = df["current_price"].isna()
+        if missing.any():
+            prices = self.latest_prices(list(df.loc[missing, "coin"]))
+            df.loc[missing, "current_price"] = [prices[c] for c in df.loc[missing, "coin"]]
+
+        price = df["current_price"].to_numpy(dtype=float)
+        confidence = df["confidence"].fillna(0).to_numpy(dtype=float) \
+            if "confidence" in df else np.zeros(len(df))
+        action = df["action"].astype(str).str.upper().to_numpy()
+        direction = np.select([action == "LONG", action == "SHORT"], [1.0, -1.0], 0.0)
+
+        risk = np.full(len(df), risk_pct)
+        if "volatility" in df:
+            vol = df["volatility"].to_numpy(dtype=float)
+            scaled = np.clip(vol * vol_multiplier, min_risk_pct, max_risk_pct)
+            risk = np.where(np.isnan(vol), risk, scaled)
+        reward = risk * (reward_pct / risk_pct)
+
+        valid = np.isfinite(price) & (price > 0)
+        price = np.where(valid, price, 0.0)
+        size = self.portfolio_value * (0.1 + confidence * 0.4)
+        size = size * np.minimum(1.0, risk_pct / risk)
+        size = np.where(valid & (direction != 0), size, 0.0)
+
+        df["entry_price"] = np.round(price, 2)
+        df["exit_price"] = np.round(price * (1 + direction * reward), 2)
+        df["stop_loss"] = np.round(price * (1 - direction * risk), 2)
+        df["current_price"] = np.round(price, 2)
+        df["risk_pct"] = np.round(risk, 4)
+        df["size"] = np.round(size, 2)
+        return df
+
     def report(self, coin: str, action: str, entry, exit_price, stop, current):
         """
         Creates a readable text report of the trade.
@@ -0,0 +1,327 @@
+# candlecache.py
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+import yfinance as yf
+
+CANDLE_DB_FILE = "data/candles.db"
+
+COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+
+
+def _period_to_timedelta(period: str) -> timedelta:
+    """Convert a yfinance period string (e.g. '30d', '6mo', '2y') to a timedelta."""
+    period = period.strip().lower()
+    units = {"mo": 30, "wk": 7, "d": 1, "y": 365}
+    for suffix, days in units.items():
+        if period.endswith(suffix):
+            return timedelta(days=int(period[: -len(suffix)]) * days)
+    raise ValueError(f"Unsupported period: {period}")
+
+
+def _flatten_columns(data: pd.DataFrame) -> pd.DataFrame:
+    """Drop the ticker level yfinance adds to single-ticker downloads."""
+    if isinstance(data.columns, pd.MultiIndex):
+        data = data.copy()
+        data.columns = data.columns.get_level_values(0)
+    return data
+
+
+class CandleCache:
+    """
+    On-disk OHLCV store keyed by (ticker, interval).
+
+    The first request for a ticker downloads the full period; later requests
+    only download bars newer than the last stored timestamp. Requests made
+    within `refresh_seconds` of the previous top-up are served from SQLite
+    without touching the network. `candle_meta.covered_from` records where
+    the stored history starts, so a request reaching further back than any
+    earlier one downloads its whole period again.
+    """
+
+    def __init__(self, db_path=CANDLE_DB_FILE, refresh_seconds: float = 60, debug: bool = False):
+        self.db_path = db_path
+        self.refresh_seconds = refresh_seconds
+        self.debug = debug
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(
+            self.db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.create_tables()
+
+    def create_tables(self):
+        c = self.conn.cursor()
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS candles (
+            ticker TEXT,
+            interval TEXT,
+            ts INTEGER,
+            open REAL,
+            high REAL,
+            low REAL,
+            close REAL,
+            volume REAL,
+            PRIMARY KEY (ticker, interval, ts)
+        ) WITHOUT ROWID
+        """)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS candle_meta (
+            ticker TEXT,
+            interval TEXT,
+            fetched_at REAL,
+            covered_from REAL,
+            PRIMARY KEY (ticker, interval)
+        )
+        """)
+        columns = {row[1] for row in c.execute("PRAGMA table_info(candle_meta)")}
+        if "covered_from" not in columns:
+            c.execute("ALTER TABLE candle_meta ADD COLUMN covered_from REAL")
+        self.conn.commit()
+
+    # ------------------------------------------------------
+    # 🗄️ Storage helpers
+    # ------------------------------------------------------
+    def _last_ts(self, ticker, interval):
+        row = self.conn.execute(
+            "SELECT MAX(ts) FROM candles WHERE ticker = ? AND interval = ?",
+            (ticker, interval),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _fetched_at(self, ticker, interval):
+        row = self.conn.execute(
+            "SELECT fetched_at FROM candle_meta WHERE ticker = ? AND interval = ?",
+            (ticker, interval),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _covered_from(self, ticker, interval):
+        """Earliest timestamp the stored history is complete from, or None."""
+        row = self.conn.execute(
+            "SELECT covered_from FROM candle_meta WHERE ticker = ? AND interval = ?",
+            (ticker, interval),
+        ).fetchone()
+        if row and row[0] is not None:
+            return row[0]
+        # Stores from before covered_from was tracked: trust the oldest bar
+        row = self.conn.execute(
+            "SELECT MIN(ts) FROM candles WHERE ticker = ? AND interval = ?",
+            (ticker, interval),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set_covered_from(self, ticker, interval, since_ts):
+        with self._lock:
+            self.conn.execute(
+                "UPDATE candle_meta SET covered_from = ? WHERE ticker = ? AND interval = ?",
+                (since_ts, ticker, interval),
+            )
+            self.conn.commit()
+
+    def _needs_backfill(self, ticker, interval, since_ts):
+        covered_from = self._covered_from(ticker, interval)
+        return covered_from is None or since_ts < covered_from
+
+    def _meta_upsert(self, ticker, interval):
+        self.conn.execute(
+            "INSERT INTO candle_meta (ticker, interval, fetched_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (ticker, interval) DO UPDATE SET fetched_at = excluded.fetched_at",
+            (ticker, interval, time.time()),
+        )
+
+    def _store(self, ticker, interval, data: pd.DataFrame):
+        data = _flatten_columns(data).dropna(subset=["Close"])
+        index = pd.DatetimeIndex(data.index)
+        if index.tz is None:
+            index = index.tz_localize("UTC")
+        ts = index.tz_convert("UTC").asi8 // 10**9
+        rows = [
+            (ticker, interval, int(t), *(float(v) for v in values))
+            for t, values in zip(ts, data[COLUMNS].to_numpy())
+        ]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self._meta_upsert(ticker, interval)
+            self.conn.commit()
+        return len(rows)
+
+    def _load(self, ticker, interval, since_ts) -> pd.DataFrame:
+        rows = self.conn.execute(
+            "SELECT ts, open, high, low, close, volume FROM candles "
+            "WHERE ticker = ? AND interval = ? AND ts >= ? ORDER BY ts",
+            (ticker, interval, since_ts),
+        ).fetchall()
+        data = pd.DataFrame(rows, columns=["ts"] + COLUMNS)
+        data.index = pd.to_datetime(data.pop("ts"), unit="s", utc=True)
+        data.index.name = "Datetime"
+        return data
+
+    def _touch(self, ticker, interval):
+        with self._lock:
+            self._meta_upsert(ticker, interval)
+            self.conn.commit()
+
+    def _needs_refresh(self, ticker, interval):
+        fetched_at = self._fetched_at(ticker, interval)
+        return fetched_at is None or time.time() - fetched_at >= self.refresh_seconds
+
+    # ------------------------------------------------------
+    # 🌐 Network top-ups
+    # ------------------------------------------------------
+    def _download(self, ticker, interval, period, last_ts):
+        if last_ts is None:
+            return yf.download(ticker, period=period, interval=interval, progress=False)
+        # Re-request the last stored bar too: it may still have been forming
+        start = datetime.fromtimestamp(last_ts, tz=timezone.utc)
+        return yf.download(ticker, start=start, interval=interval, progress=False)
+
+    def refresh(self, ticker: str, interval: str, period: str):
+        """
+        Fetch bars newer than the last stored one and append them, or the
+        whole period when the store does not reach back far enough.
+        """
+        cutoff = time.time() - _period_to_timedelta(period).total_seconds()
+        last_ts = self._last_ts(ticker, interval)
+        if last_ts is not None and (last_ts < cutoff or
+                                    self._needs_backfill(ticker, interval, cutoff)):
+            # Gap larger than the requested window, or history starting later
+            # than requested: refetch the window
+            last_ts = None
+
+        data = self._download(ticker, interval, period, last_ts)
+        if data is None or data.empty:
+            self._touch(ticker, interval)
+            stored = 0
+        else:
+            stored = self._store(ticker, interval, data)
+        if last_ts is None:
+            self._set_covered_from(ticker, interval, cutoff)
+        if not stored:
+            return 0
+        if self.debug:
+            mode = "full" if last_ts is None else "incremental"
+            print(f"🗄️ Cached {stored} {interval} bars for {ticker} ({mode})")
+        return stored
+
+    def _refresh_group(self, tickers, interval, period, last_ts):
+        """Top up several tickers with one grouped download."""
+        cutoff = time.time() - _period_to_timedelta(period).total_seconds()
+        if last_ts is None:
+            data = yf.download(tickers, period=period, interval=interval,
+                               group_by="ticker", threads=True, progress=False)
+        else:
+            start = datetime.fromtimestamp(last_ts, tz=timezone.utc)
+            data = yf.download(tickers, start=start, interval=interval,
+                               group_by="ticker", threads=True, progress=False)
+
+        for ticker in tickers:
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    self._touch(ticker, interval)
+                    continue
+                frame = data[ticker]
+            else:
+                frame = data
+            if frame.dropna(how="all").empty:
+                self._touch(ticker, interval)
+            else:
+                self._store(ticker, interval, frame)
+            if last_ts is None:
+                self._set_covered_from(ticker, interval, cutoff)
+
+    def refresh_many(self, tickers, interval: str, period: str, chunk_size: int = 50):
+        """
+        Bring many tickers up to date in a few grouped requests. Tickers with
+        no usable history (or history starting too late) are downloaded for
+        the whole period; the rest are topped up from the oldest last-stored
+        bar in their chunk.
+        """
+        cutoff = time.time() - _period_to_timedelta(period).total_seconds()
+        full, incremental = [], []
+        for ticker in tickers:
+            last_ts = self._last_ts(ticker, interval)
+            if last_ts is None or last_ts < cutoff or self._needs_backfill(ticker, interval, cutoff):
+                full.append(ticker)
+            else:
+                incremental.append((ticker, last_ts))
+
+        for i in range(0, len(full), chunk_size):
+            chunk = full[i:i + chunk_size]
+            try:
+                self._refresh_group(chunk, interval, period, None)
+            except Exception as e:
+                print(f"⚠️ Grouped download failed for {len(chunk)} tickers: {e}")
+
+        incremental.sort(key=lambda item: item[1])
+        for i in range(0, len(incremental), chunk_size):
+            chunk = incremental[i:i + chunk_size]
+            try:
+                self._refresh_group([t for t, _ in chunk], interval,
+                                    period, chunk[0][1])
+            except Exception as e:
+                print(f"⚠️ Grouped top-up failed for {len(chunk)} tickers: {e}")
+
+        if self.debug:
+            print(f"🗄️ Refreshed {len(full)} full / {len(incremental)} incremental "
+                  f"{interval} histories")
+
+    # ------------------------------------------------------
+    # 📦 Public API
+    # ------------------------------------------------------
+    def get(self, ticker: str, interval: str, period: str) -> pd.DataFrame:
+        """
+        Return OHLCV bars for the last `period`, topping up the local store first
+        when it is older than `refresh_seconds`. Falls back to stored bars when
+        the download fails; raises only if nothing is stored.
+        """
+        ticker = ticker.upper()
+        since = time.time() - _period_to_timedelta(period).total_seconds()
+        if self._needs_refresh(ticker, interval) or self._needs_backfill(ticker, interval, since):
+            try:
+                self.refresh(ticker, interval, period)
+            except Exception as e:
+                if self._last_ts(ticker, interval) is None:
+                    raise
+                print(f"⚠️ Candle refresh failed for {ticker}, serving cached bars: {e}")
+
+        return self._load(ticker, interval, int(since))
+
+    def get_many(self, tickers, interval: str, period: str, chunk_size: int = 50):
+        """Batch version of get(): returns {ticker: DataFrame}."""
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        since = int(time.time() - _period_to_timedelta(period).total_seconds())
+        stale = [t for t in tickers if self._needs_refresh(t, interval) or
+                 self._needs_backfill(t, interval, since)]
+        if stale:
+            self.refresh_many(stale, interval, period, chunk_size)
+
+        return {t: self._load(t, interval, since) for t in tickers}
+
+    def last_close(self, ticker: str, interval: str, period: str):
+        data = self.get(ticker, interval, period)
+        if data.empty:
+            return None
+        return float(data["Close"].iloc[-1])
+
+    def close(self):
+        self.conn.close()
+
+
+_default_cache = None
+_default_pid = None
+
+
+def get_candle_cache() -> CandleCache:
+    """Process-wide shared CandleCache (re-created after a fork)."""
+    global _default_cache, _default_pid
+    if _default_cache is None or _default_pid != os.getpid():
+        _default_cache = CandleCache()
+        _default_pid = os.getpid()
+    return _default_cache
@@ -1,16 +1,17 @@
-import yfinance as yf
+from candlecache import get_candle_cache
 
 
 class ChartAgent:
-    def __init__(self, coin, timeframe="4h", debug=False):
+    def __init__(self, coin, timeframe="4h", debug=False, candle_cache=None):
         self.coin = coin.upper()
         self.timeframe = timeframe
         self.debug = debug
+        self.candle_cache = candle_cache or get_candle_cache()
 
     def analyze_chart(self):
         try:
             ticker = f"{self.coin}-USD"
-            data = yf.download(ticker, period="30d", interval=self.timeframe)
+            data = self.candle_cache.get(ticker, self.timeframe, "30d")
             if data.empty:
                 print(f"⚠️ No chart data for {ticker}")
                 return "NEUTRAL", self.timeframe
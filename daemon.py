@@ -0,0 +1,165 @@
+# daemon.py
+import asyncio
+import signal
+import threading
+import time
+from datetime import datetime, timezone
+
+from calculates import CalculateAgent
+from database import Database
+from decisionagent import DecisionAgent
+from mainagent import MainAgent
+from neardup import NEARDUP_INDEX_FILE, NearDuplicateIndex
+from newscollector import client_session
+from newscorpus import NewsCorpus
+from sentimentcache import get_sentiment_cache
+from technicalagent import TechnicalAgent
+
+_UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+
+def timeframe_seconds(timeframe):
+    """'15m' → 900, '4h' → 14400, '1d' → 86400."""
+    timeframe = timeframe.strip().lower()
+    try:
+        return int(timeframe[:-1]) * _UNIT_SECONDS[timeframe[-1]]
+    except (KeyError, ValueError):
+        raise ValueError(f"Unsupported timeframe: {timeframe}")
+
+
+def next_boundary(now, interval, delay=0):
+    """
+    First candle close strictly after `now - delay`, plus `delay`.
+    Boundaries are aligned to the UTC epoch, as exchange candles are.
+    """
+    return (int(now - delay) // interval + 1) * interval + delay
+
+
+def _fmt(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime("%Y-%m-%d %H:%M:%S UTC")
+
+
+class AnalysisDaemon:
+    """
+    Keeps one set of agents alive and analyzes a list of coins right after
+    every timeframe candle closes. Models and candle caches stay warm
+    between cycles instead of being rebuilt per cron run, and every cycle
+    runs on one event loop and one pooled aiohttp session.
+
+    If a cycle runs past the next boundary, the missed boundaries are skipped
+    rather than queued, so cycles never overlap or pile up.
+    """
+
+    def __init__(self, coins, portfolio_value, timeframe="4h", delay=30, debug=False,
+                 report=False, sentiment_backend=None, run_now=False, feeds=False):
+        self.coins = [c.upper() for c in coins]
+        self.timeframe = timeframe
+        self.interval = timeframe_seconds(timeframe)
+        self.delay = delay
+        self.run_now = run_now
+        self.stop_event = threading.Event()
+
+        self.db = Database()
+        self.agent = MainAgent(
+            coin_name=self.coins[0],
+            portfolio_value=portfolio_value,
+            timeframe=timeframe,
+            debug=debug,
+            report=report,
+            technical_agent=TechnicalAgent(debug=debug),
+            decision_agent=DecisionAgent(
+                cache=get_sentiment_cache(), backend=sentiment_backend),
+            trade_calc=CalculateAgent(portfolio_value),
+            db=self.db,
+        )
+        # Sources shared between coins are fetched and scored once per cycle;
+        # stories syndicated since an earlier cycle (or run) are not rescored
+        self.neardup_index = NearDuplicateIndex.load(NEARDUP_INDEX_FILE)
+        self.news_corpus = NewsCorpus(self.coins, skip_unchanged=True, debug=debug,
+                                      neardup_index=self.neardup_index, feeds=feeds)
+        self.loop = asyncio.new_event_loop()
+        self.session = self.loop.run_until_complete(self._open_session())
+
+    @staticmethod
+    async def _open_session():
+        return client_session()
+
+    def stop(self, *_):
+        if not self.stop_event.is_set():
+            print("🛑 Shutdown requested; finishing the current coin...")
+        self.stop_event.set()
+
+    def warm_up(self):
+        """Load the sentiment model (or reach the server) before the first boundary."""
+        start = time.perf_counter()
+        self.agent.decision_agent.warm_up()
+        print(f"🔥 Models ready in {time.perf_counter() - start:.2f}s")
+
+    def run_cycle(self):
+        start = time.perf_counter()
+        finished = []
+        try:
+            self.loop.run_until_complete(self.news_corpus.collect_async(session=self.session))
+            # Fills the sentiment cache, so per-coin classification is a lookup
+            self.news_corpus.score(self.agent.decision_agent)
+        except Exception as e:
+            print(f"⚠️ News collection failed this cycle: {e}")
+            self.news_corpus.articles, self.news_corpus.collected = [], []
+
+        for coin in self.coins:
+            if self.stop_event.is_set():
+                break
+            try:
+                self.loop.run_until_complete(self.agent.analyze_coin_async(
+                    coin, news_texts=self.news_corpus.for_coin(coin)))
+                finished.append(coin)
+            except Exception as e:
+                print(f"⚠️ {coin} failed this cycle: {e}")
+        try:
+            self.db.flush()
+            # Only now count this cycle's pages as processed; stories of coins
+            # that failed or were not reached stay new for the next cycle
+            self.news_corpus.commit(failed=[c for c in self.coins if c not in finished])
+        except Exception as e:
+            print(f"⚠️ Results not stored; this cycle's pages stay new: {e}")
+        try:
+            self.neardup_index.save(NEARDUP_INDEX_FILE)
+        except OSError as e:
+            print(f"⚠️ Failed to save near-duplicate index: {e}")
+        print(f"⏱️ Cycle finished: {len(finished)}/{len(self.coins)} coins in "
+              f"{time.perf_counter() - start:.1f}s")
+
+    def run(self):
+        signal.signal(signal.SIGINT, self.stop)
+        signal.signal(signal.SIGTERM, self.stop)
+
+        print(f"🤖 Daemon started for {', '.join(self.coins)} "
+              f"(timeframe {self.timeframe}, +{self.delay}s after close)")
+        self.warm_up()
+
+        if self.run_now and not self.stop_event.is_set():
+            self.run_cycle()
+
+        scheduled = next_boundary(time.time(), self.interval, self.delay)
+        while not self.stop_event.is_set():
+            print(f"💤 Next run at {_fmt(scheduled)}")
+            if self.stop_event.wait(max(0.0, scheduled - time.time())):
+                break
+
+            self.run_cycle()
+
+            # Overrun protection: skip boundaries that passed while we worked
+            following = next_boundary(time.time(), self.interval, self.delay)
+            missed = (following - scheduled) // self.interval - 1
+            if missed > 0:
+                print(f"⚠️ Cycle overran; skipping {missed} missed run(s)")
+            scheduled = following
+
+        self.close()
+        print("👋 Daemon stopped.")
+
+    def close(self):
+        if not self.loop.is_closed():
+            self.loop.run_until_complete(self.session.close())
+            self.loop.close()
+        self.db.close()
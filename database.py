@@ -1,17 +1,74 @@
+import atexit
 import sqlite3
-import pandas as pd
-from datetime import datetime
+import threading
+import time
+from datetime import datetime, timezone
 import os
 
 DB_FILE = "data/sarva_data.db"
 
+NEWS_COLUMNS = ("date", "date_ts", "coin", "url", "sentiment", "confidence", "action", "amount",
+                "source", "text_excerpt", "entry_price", "exit_price", "stop_loss", "tech_bias",
+                "timeframe", "text_length")
+TECHNICAL_COLUMNS = ("date", "date_ts", "coin", "timeframe", "bias", "strength", "reason")
+
+
+def to_timestamp(value):
+    """Epoch seconds for a datetime, ISO string or number (naive = UTC); None passes through."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def utc_now():
+    """(naive UTC datetime, epoch seconds) for one row."""
+    now = datetime.now(timezone.utc)
+    return now.replace(tzinfo=None), now.timestamp()
+
+
+def connect(db_path):
+    """Shared connection setup: WAL so report readers never block writers."""
+    if os.path.dirname(db_path):
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    conn = sqlite3.connect(db_path, timeout=30, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def add_date_ts(conn, table):
+    """Add and backfill the numeric date_ts column on databases created before it existed."""
+    columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    if "date_ts" not in columns:
+        conn.execute(f"ALTER TABLE {table} ADD COLUMN date_ts REAL")
+        conn.execute(f"UPDATE {table} SET date_ts = ROUND((julianday(date) - 2440587.5) * 86400.0, 3) "
+                     f"WHERE date_ts IS NULL")
+
 
 class Database:
-    def __init__(self, db_path=DB_FILE):
+    """
+    Analysis store over one persistent WAL connection. Rows are buffered
+    and written with executemany in a single transaction once `batch_size`
+    rows are pending or, on the next write, `flush_interval` seconds have
+    passed; readers flush first so they always see this process's own
+    writes, and agents flush at the end of each run. Rows from a failed
+    flush stay buffered for the next one.
+    """
+
+    def __init__(self, db_path=DB_FILE, batch_size=500, flush_interval=2.0):
         self.db_path = db_path
-        os.makedirs(os.path.dirname(db_path), exist_ok=True)
-        self.conn = sqlite3.connect(self.db_path)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = connect(self.db_path)
+        self._lock = threading.Lock()
+        self._pending = {"news_analysis": [], "technical_analysis": []}
+        self._last_flush = time.monotonic()
         self.create_tables()
+        atexit.register(self.close)
 
     def create_tables(self):
         c = self.conn.cursor()
@@ -32,7 +89,8 @@ class Database:
             stop_loss REAL,
             tech_bias TEXT,
             timeframe TEXT,
-            text_length INTEGER
+            text_length INTEGER,
+            date_ts REAL
         )
         """)
         c.execute("""
@@ -43,110 +101,242 @@ class Database:
             timeframe TEXT,
             bias TEXT,
             strength REAL,
-            reason TEXT
+            reason TEXT,
+            date_ts REAL
         )
         """)
+        add_date_ts(self.conn, "news_analysis")
+        add_date_ts(self.conn, "technical_analysis")
+        # Covering indexes for the per-coin summaries and time-range scans
+        c.execute("CREATE INDEX IF NOT EXISTS idx_news_coin_sentiment "
+                  "ON news_analysis(coin, sentiment)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_news_coin_date "
+                  "ON news_analysis(coin, date_ts)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_technical_coin_bias "
+                  "ON technical_analysis(coin, bias, strength, date)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_technical_coin_date "
+                  "ON technical_analysis(coin, date_ts)")
         self.conn.commit()
+        self.create_rollups()
 
-    def save_news(self, coin, url, sentiment, confidence, action, amount, text_excerpt, entry_price, exit_price, stop_loss, tech_bias, timeframe, source="auto"):
+    # ------------------------------------------------------
+    # 📈 Per-coin rollups, maintained by triggers on insert
+    # ------------------------------------------------------
+    def create_rollups(self):
+        c = self.conn.cursor()
+        existing = {row[0] for row in c.execute(
+            "SELECT name FROM sqlite_master WHERE type='table'")}
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS news_rollup (
+            coin TEXT NOT NULL,
+            sentiment TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (coin, sentiment)
+        ) WITHOUT ROWID
+        """)
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS technical_rollup (
+            coin TEXT NOT NULL,
+            bias TEXT NOT NULL,
+            strength_sum REAL NOT NULL,
+            strength_count INTEGER NOT NULL,
+            last_update TEXT,
+            PRIMARY KEY (coin, bias)
+        ) WITHOUT ROWID
+        """)
+        c.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_news_rollup AFTER INSERT ON news_analysis
+        BEGIN
+            INSERT INTO news_rollup (coin, sentiment, count)
+            VALUES (COALESCE(NEW.coin, ''), COALESCE(NEW.sentiment, ''), 1)
+            ON CONFLICT (coin, sentiment) DO UPDATE SET count = count + 1;
+        END
+        """)
+        c.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_technical_rollup AFTER INSERT ON technical_analysis
+        BEGIN
+            INSERT INTO technical_rollup (coin, bias, strength_sum, strength_count, last_update)
+            VALUES (COALESCE(NEW.coin, ''), COALESCE(NEW.bias, ''), COALESCE(NEW.strength, 0),
+                    NEW.strength IS NOT NULL, NEW.date)
+            ON CONFLICT (coin, bias) DO UPDATE SET
+                strength_sum = strength_sum + excluded.strength_sum,
+                strength_count = strength_count + excluded.strength_count,
+                last_update = MAX(COALESCE(last_update, ''), COALESCE(excluded.last_update, ''));
+        END
+        """)
+        self.conn.commit()
+
+        # Databases that predate the rollups: seed them from history once
+        if not {"news_rollup", "technical_rollup"} <= existing:
+            self.rebuild_rollups()
+
+    def rebuild_rollups(self):
+        """Recompute both rollup tables from the raw history."""
+        self.flush()
+        start = time.perf_counter()
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM news_rollup")
+            self.conn.execute("""
+                INSERT INTO news_rollup (coin, sentiment, count)
+                SELECT COALESCE(coin, ''), COALESCE(sentiment, ''), COUNT(*)
+                FROM news_analysis GROUP BY 1, 2
+            """)
+            self.conn.execute("DELETE FROM technical_rollup")
+            self.conn.execute("""
+                INSERT INTO technical_rollup (coin, bias, strength_sum, strength_count, last_update)
+                SELECT COALESCE(coin, ''), COALESCE(bias, ''), COALESCE(SUM(strength), 0),
+                       COUNT(strength), MAX(date)
+                FROM technical_analysis GROUP BY 1, 2
+            """)
+        print(f"🔁 Rebuilt rollups in {time.perf_counter() - start:.2f}s")
+
+    def _queue(self, table, row):
+        with self._lock:
+            self._pending[table].append(row)
+            due = (len(self._pending[table]) >= self.batch_size or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # Already reported; the rows stay queued for the next flush
+                pass
+
+    def flush(self):
+        """Write every buffered row in one transaction; on failure re-queue them and raise."""
+        with self._lock:
+            pending = {table: rows for table, rows in self._pending.items() if rows}
+            self._pending = {table: [] for table in self._pending}
+            self._last_flush = time.monotonic()
+            if not pending:
+                return
+            try:
+                with self.conn:
+                    for table, rows in pending.items():
+                        columns = NEWS_COLUMNS if table == "news_analysis" else TECHNICAL_COLUMNS
+                        self.conn.executemany(
+                            f"INSERT INTO {table} ({', '.join(columns)}) "
+                            f"VALUES ({', '.join('?' * len(columns))})", rows)
+            except Exception as e:
+                print(f"⚠️ Database error flushing {sum(map(len, pending.values()))} rows: {e}")
+                for table, rows in pending.items():
+                    self._pending[table] = rows + self._pending[table]
+                raise
+
+    def close(self):
+        if self.conn is None:
+            return
         try:
-            c = self.conn.cursor()
-            c.execute("""
-            INSERT INTO news_analysis (date, coin, url, sentiment, confidence, action, amount, source, text_excerpt,
-                                      entry_price, exit_price, stop_loss, tech_bias, timeframe, text_length)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                datetime.utcnow().isoformat(),
-                coin.upper(),
-                url,
-                sentiment,
-                confidence,
-                action,
-                amount,
-                source,
-                text_excerpt[:500],
-                entry_price,
-                exit_price,
-                stop_loss,
-                tech_bias,
-                timeframe,
-                len(text_excerpt)
-            ))
-            self.conn.commit()
-        except Exception as e:
-            print(f"⚠️ Database error saving news: {e}")
+            self.flush()
+        except Exception:
+            print(f"⚠️ Dropping {sum(map(len, self._pending.values()))} unsaved rows on close")
+        self.conn.close()
+        self.conn = None
+
+    def save_news(self, coin, url, sentiment, confidence, action, amount, text_excerpt, entry_price, exit_price, stop_loss, tech_bias, timeframe, source="auto"):
+        date, date_ts = utc_now()
+        self._queue("news_analysis", (
+            date.isoformat(),
+            date_ts,
+            coin.upper(),
+            url,
+            sentiment,
+            confidence,
+            action,
+            amount,
+            source,
+            text_excerpt[:500],
+            entry_price,
+            exit_price,
+            stop_loss,
+            tech_bias,
+            timeframe,
+            len(text_excerpt)
+        ))
 
     def save_technical(self, coin, timeframe, bias, strength, reason):
-        try:
-            c = self.conn.cursor()
-            c.execute("""
-            INSERT INTO technical_analysis (date, coin, timeframe, bias, strength, reason)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """, (
-                datetime.utcnow().isoformat(),
-                coin.upper(),
-                timeframe,
-                bias,
-                strength,
-                reason
-            ))
-            self.conn.commit()
-        except Exception as e:
-            print(f"⚠️ Database error saving technical: {e}")
+        date, date_ts = utc_now()
+        self._queue("technical_analysis", (
+            date.isoformat(),
+            date_ts,
+            coin.upper(),
+            timeframe,
+            bias,
+            strength,
+            reason
+        ))
+
+    def _news_rollup(self):
+        return self.conn.execute(
+            "SELECT coin, sentiment, count FROM news_rollup ORDER BY coin, sentiment").fetchall()
+
+    def _technical_rollup(self):
+        return self.conn.execute("""
+            SELECT coin, bias,
+                   CASE WHEN strength_count > 0 THEN strength_sum / strength_count END,
+                   last_update
+            FROM technical_rollup
+            ORDER BY last_update DESC
+        """).fetchall()
 
     def get_news_summary(self):
         try:
-            df = pd.read_sql_query(
-                "SELECT coin, sentiment, COUNT(*) as count FROM news_analysis GROUP BY coin, sentiment", self.conn)
-            if df.empty:
+            self.flush()
+            rows = self._news_rollup()
+            if not rows:
                 return "No news data yet."
             summary = "\n📰 News Summary:\n"
-            for coin in df["coin"].unique():
-                summary += f"\n{coin}:\n"
-                sub = df[df["coin"] == coin]
-                for _, row in sub.iterrows():
-                    summary += f"   {row['sentiment']}: {int(row['count'])}\n"
+            current = None
+            for coin, sentiment, count in rows:
+                if coin != current:
+                    summary += f"\n{coin}:\n"
+                    current = coin
+                summary += f"   {sentiment}: {count}\n"
             return summary
         except Exception as e:
             return f"⚠️ Database error: {e}"
 
     def get_technical_summary(self):
         try:
-            df = pd.read_sql_query("""
-                SELECT coin, bias, AVG(strength) as avg_strength, MAX(date) as last_update
-                FROM technical_analysis
-                GROUP BY coin, bias
-                ORDER BY last_update DESC
-            """, self.conn)
-            if df.empty:
+            self.flush()
+            rows = self._technical_rollup()
+            if not rows:
                 return "No technical data yet."
             summary = "\n📊 Technical Summary:\n"
-            for _, row in df.iterrows():
-                summary += f"   {row['coin']} → {row['bias']} (avg strength {row['avg_strength']:.2f}) [Last: {row['last_update'][:19]}]\n"
+            for coin, bias, avg_strength, last_update in rows:
+                summary += (f"   {coin} → {bias} (avg strength {avg_strength or 0:.2f}) "
+                            f"[Last: {(last_update or '')[:19]}]\n")
             return summary
         except Exception as e:
             return f"⚠️ Database error: {e}"
 
     def get_best_coins(self):
         try:
-            df_news = pd.read_sql_query("""
-                SELECT coin,
-                       SUM(CASE WHEN sentiment='positive' THEN 1 ELSE 0 END) as good,
-                       SUM(CASE WHEN sentiment='negative' THEN 1 ELSE 0 END) as bad
-                FROM news_analysis GROUP BY coin
-            """, self.conn)
-            df_tech = pd.read_sql_query("""
-                SELECT coin, bias, AVG(strength) as strength FROM technical_analysis GROUP BY coin, bias
-            """, self.conn)
-            if df_news.empty and df_tech.empty:
+            self.flush()
+            news = {}
+            for coin, sentiment, count in self._news_rollup():
+                good, bad = news.get(coin, (0, 0))
+                news[coin] = (good + count * (sentiment == "positive"),
+                              bad + count * (sentiment == "negative"))
+            tech = self._technical_rollup()
+            if not news and not tech:
                 return "⚠️ Not enough data to find best coins."
-            df = pd.merge(df_news, df_tech, on="coin", how="outer").fillna(0)
-            df["score"] = (df["good"] - df["bad"]) + (df["strength"] * df["bias"].apply(
-                lambda x: 1 if x == "BULLISH" else -1 if x == "BEARISH" else 0))
-            df = df.sort_values("score", ascending=False)
+
+            # One row per (coin, bias), plus news-only coins, as the old outer merge did
+            rows = []
+            for coin, bias, strength, _ in tech:
+                good, bad = news.get(coin, (0, 0))
+                direction = 1 if bias == "BULLISH" else -1 if bias == "BEARISH" else 0
+                rows.append((coin, (good - bad) + (strength or 0) * direction, bias, strength or 0))
+            tech_coins = {row[0] for row in tech}
+            for coin, (good, bad) in news.items():
+                if coin not in tech_coins:
+                    rows.append((coin, good - bad, 0, 0))
+            rows.sort(key=lambda row: row[1], reverse=True)
+
             summary = "\n💡 Best Coins to Trade:\n"
-            for _, row in df.iterrows():
-                summary += f"   {row['coin']}: {row['score']:.2f} ({row['bias']}, {row['strength']:.2f})\n"
+            for coin, score, bias, strength in rows:
+                summary += f"   {coin}: {score:.2f} ({bias}, {strength:.2f})\n"
             return summary
         except Exception as e:
             return f"⚠️ Database error: {e}"
@@ -159,4 +349,23 @@ class Database:
         return report
 
     def __del__(self):
-        self.conn.close()
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Sarva analysis database")
+    parser.add_argument("command", choices=["report", "rebuild-rollups"])
+    parser.add_argument("--db", default=DB_FILE)
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    if args.command == "rebuild-rollups":
+        db.rebuild_rollups()
+    else:
+        print(db.generate_report())
+    db.close()
@@ -1,16 +1,35 @@
 # databaseagent.py
-import sqlite3
-from datetime import datetime
+import atexit
+import threading
+import time
+
+from database import add_date_ts, connect, to_timestamp, utc_now
+
+ANALYSIS_COLUMNS = ("coin", "url", "date", "date_ts", "sentiment", "action", "confidence",
+                    "amount", "entry_price", "exit_price", "stop_loss", "tech_bias",
+                    "timeframe", "text_length", "summary")
 
 
 class DatabaseAgent:
-    def __init__(self, db_path="sarva_news.db"):
+    """
+    Per-article analysis log. Uses one WAL connection for its lifetime and
+    buffers save_analysis() rows, writing them in batched transactions.
+    Rows from a failed flush stay buffered for the next one.
+    """
+
+    def __init__(self, db_path="sarva_news.db", batch_size=500, flush_interval=2.0):
         self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = connect(self.db_path)
+        self._lock = threading.Lock()
+        self._pending = []
+        self._last_flush = time.monotonic()
         self._create_tables()
+        atexit.register(self.close)
 
     def _create_tables(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self.conn.cursor()
         c.execute('''CREATE TABLE IF NOT EXISTS news_analysis (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             coin TEXT,
@@ -26,22 +45,23 @@ class DatabaseAgent:
             tech_bias TEXT,
             timeframe TEXT,
             text_length INTEGER,
-            summary TEXT
+            summary TEXT,
+            date_ts REAL
         )''')
-        conn.commit()
-        conn.close()
+        add_date_ts(self.conn, "news_analysis")
+        # Covers query_report: filter by coin/sentiment/date, newest first
+        c.execute("CREATE INDEX IF NOT EXISTS idx_analysis_coin_date ON news_analysis"
+                  "(coin, date_ts, sentiment, action, confidence, url, date)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_analysis_date ON news_analysis(date_ts)")
+        self.conn.commit()
 
     def save_analysis(self, coin, url, decision, sentiment, tech_bias, timeframe, text):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-
-        c.execute('''INSERT INTO news_analysis 
-            (coin, url, date, sentiment, action, confidence, amount, entry_price, exit_price, stop_loss, 
-             tech_bias, timeframe, text_length, summary)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
+        date, date_ts = utc_now()
+        row = (
             coin.upper(),
             url,
-            datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S"),
+            date.strftime("%Y-%m-%d %H:%M:%S"),
+            date_ts,
             sentiment,
             decision.get("action"),
             decision.get("confidence"),
@@ -53,14 +73,47 @@ class DatabaseAgent:
             timeframe,
             len(text),
             text[:300]  # short preview
-        ))
-        conn.commit()
-        conn.close()
+        )
+        with self._lock:
+            self._pending.append(row)
+            due = (len(self._pending) >= self.batch_size or
+                   time.monotonic() - self._last_flush >= self.flush_interval)
+        if due:
+            try:
+                self.flush()
+            except Exception:
+                # Already reported; the rows stay queued for the next flush
+                pass
 
-    def query_report(self, coin=None, sentiment=None, start_date=None, end_date=None):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+    def flush(self):
+        """Write buffered rows in one transaction; on failure re-queue them and raise."""
+        with self._lock:
+            rows, self._pending = self._pending, []
+            self._last_flush = time.monotonic()
+            if not rows:
+                return
+            try:
+                with self.conn:
+                    self.conn.executemany(
+                        f"INSERT INTO news_analysis ({', '.join(ANALYSIS_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(ANALYSIS_COLUMNS))})", rows)
+            except Exception as e:
+                print(f"⚠️ Database error flushing {len(rows)} rows: {e}")
+                self._pending = rows + self._pending
+                raise
+
+    def close(self):
+        if self.conn is None:
+            return
+        try:
+            self.flush()
+        except Exception:
+            print(f"⚠️ Dropping {len(self._pending)} unsaved rows on close")
+        self.conn.close()
+        self.conn = None
 
+    def query_report(self, coin=None, sentiment=None, start_date=None, end_date=None):
+        self.flush()
         query = "SELECT date, coin, sentiment, action, confidence, url FROM news_analysis WHERE 1=1"
         params = []
 
@@ -73,16 +126,14 @@ class DatabaseAgent:
             params.append(sentiment.upper())
 
         if start_date:
-            query += " AND date >= ?"
-            params.append(start_date)
+            query += " AND date_ts >= ?"
+            params.append(to_timestamp(start_date))
 
         if end_date:
-            query += " AND date <= ?"
-            params.append(end_date)
+            query += " AND date_ts <= ?"
+            params.append(to_timestamp(end_date))
 
-        query += " ORDER BY date DESC"
+        query += " ORDER BY date_ts DESC"
 
-        c.execute(query, params)
-        results = c.fetchall()
-        conn.close()
-        return results
+        with self._lock:
+            return self.conn.execute(query, params).fetchall()
@@ -1,36 +1,178 @@
+import os
+import time
 import torch
 import torch.nn.functional as F
+from modelregistry import get_finbert
+from inferencebackend import load_backend
+from sentimentserver import SentimentClient
 
 
 class DecisionAgent:
-    def __init__(self, model, tokenizer):
-        self.model = model
-        self.tokenizer = tokenizer
-        self.model.eval()
+    def __init__(self, model=None, tokenizer=None, batch_size=16, max_length=512, max_batch_tokens=8192,
+                 cache=None, model_id=None, backend=None, server=None, server_retry=60):
+        # Without an explicit model, FinBERT is taken from the shared registry
+        # on first inference, so cache-only paths never load it
+        self._model = model
+        self._tokenizer = tokenizer
+        if model is not None:
+            model.eval()
         self.labels = ["negative", "neutral", "positive"]
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.max_batch_tokens = max_batch_tokens
 
-    def analyze(self, text, tech_bias=None, timeframe=None, debug=False):
-        """Analyze news text and combine with technical bias."""
-        if not text or len(text.strip()) < 30:
-            if debug:
-                print("⚠️ Skipping empty/short news text")
-            return "HOLD", 1.0, "neutral", tech_bias, timeframe
-
-        inputs = self.tokenizer(
-            text,
-            return_tensors="pt",
-            truncation=True,
-            padding=True,
-            max_length=512,
-        )
-        with torch.no_grad():
-            outputs = self.model(**inputs)
-            logits = outputs.logits
-            probs = F.softmax(logits, dim=1)
-            conf, pred = torch.max(probs, dim=1)
-
-        sentiment_label = self.labels[pred.item()]
-        confidence = conf.item()
+        # Optional SentimentCache; hits skip tokenization and the forward pass
+        self.cache = cache
+        config = getattr(model, "config", None)
+        self.base_model_id = model_id or getattr(
+            config, "_name_or_path", None) or (type(model).__name__ if model is not None else "finbert")
+
+        # Inference backend: "eager" (fp32 PyTorch), "int8" or "onnx"
+        self.backend_name = backend or os.getenv(
+            "SARVA_SENTIMENT_BACKEND", "eager")
+        self._backend = None
+
+        # Optional shared inference server (sentimentserver.py); while it is
+        # unreachable, inference runs in-process and the server is retried
+        # every `server_retry` seconds
+        self.server = server or os.getenv("SARVA_SENTIMENT_SERVER")
+        self.client = SentimentClient(self.server) if self.server else None
+        self.server_retry = server_retry
+        self._server_down_until = 0.0
+
+    def _ensure_model(self):
+        if self._model is None or self._tokenizer is None:
+            self._model, self._tokenizer = get_finbert()
+            self._model.eval()
+
+    @property
+    def model(self):
+        self._ensure_model()
+        return self._model
+
+    @property
+    def tokenizer(self):
+        self._ensure_model()
+        return self._tokenizer
+
+    @property
+    def model_id(self):
+        """
+        Cache and server key: the base id plus the backend that actually
+        loaded (the requested one until then), so an eager fallback never
+        stores fp32 results under a quantized backend's id.
+        """
+        name = self._backend.name if self._backend is not None else self.backend_name
+        return self.base_model_id if name == "eager" else f"{self.base_model_id}:{name}"
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            self._backend = load_backend(
+                self.backend_name, self._model, self._tokenizer)
+        return self._backend
+
+    @staticmethod
+    def _is_too_short(text):
+        return not text or len(text.strip()) < 30
+
+    def _batches(self, lengths):
+        """
+        Group indices sorted by token length into batches bounded by
+        batch_size and by max_batch_tokens (rows x longest row).
+        """
+        order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+        batches, current = [], []
+        for i in order:
+            if current and (len(current) >= self.batch_size or
+                            (len(current) + 1) * lengths[i] > self.max_batch_tokens):
+                batches.append(current)
+                current = []
+            current.append(i)
+        if current:
+            batches.append(current)
+        return batches
+
+    def warm_up(self):
+        """Connect to the server, or load the local model, before the first text."""
+        if self._use_server():
+            try:
+                print(f"🔌 Using sentiment server {self.server} ({self.client.ping()})")
+                return
+            except (OSError, RuntimeError, ValueError) as e:
+                self._server_failed(e)
+        self.backend
+
+    def _use_server(self):
+        return self.client is not None and time.monotonic() >= self._server_down_until
+
+    def _server_failed(self, error):
+        print(f"⚠️ Sentiment server {self.server} unavailable ({error}); "
+              f"using the local model")
+        self._server_down_until = time.monotonic() + self.server_retry
+
+    def _predict(self, texts):
+        """Returns [(label, confidence, probs)] in input order, from the server if set."""
+        if self._use_server():
+            try:
+                return self.client.predict(texts, self.model_id)
+            except (OSError, RuntimeError, ValueError) as e:
+                self._server_failed(e)
+        return self._predict_local(texts)
+
+    def _predict_local(self, texts):
+        """Run the model in-process; returns [(label, confidence, probs)] in input order."""
+        backend = self.backend
+        encodings = backend.tokenizer(
+            texts, truncation=True, max_length=self.max_length)
+        input_ids = encodings["input_ids"]
+        results = [None] * len(texts)
+
+        for batch in self._batches([len(ids) for ids in input_ids]):
+            features = [{key: encodings[key][i] for key in encodings.keys()}
+                        for i in batch]
+            inputs = backend.tokenizer.pad(features, return_tensors="pt")
+            with torch.inference_mode():
+                # Every backend returns logits in the same label order
+                probs = F.softmax(backend.logits(inputs), dim=1)
+                conf, pred = torch.max(probs, dim=1)
+
+            for row, i in enumerate(batch):
+                results[i] = (self.labels[pred[row].item()],
+                              conf[row].item(), probs[row].tolist())
+        return results
+
+    def classify_many(self, texts):
+        """
+        Classify many texts in length-sorted batches.
+        Returns [(sentiment_label, confidence)] in input order; empty/short
+        texts are reported as ("neutral", 1.0) without running the model.
+        """
+        results = [("neutral", 1.0)] * len(texts)
+        valid = [i for i, text in enumerate(texts) if not self._is_too_short(text)]
+
+        if self.cache is not None and valid:
+            cached = self.cache.get_many([texts[i] for i in valid], self.model_id)
+            for i, hit in zip(valid, cached):
+                if hit is not None:
+                    results[i] = (hit[0], hit[1])
+            valid = [i for i, hit in zip(valid, cached) if hit is None]
+
+        if valid:
+            predictions = self._predict([texts[i] for i in valid])
+            for i, (label, confidence, _) in zip(valid, predictions):
+                results[i] = (label, confidence)
+            if self.cache is not None:
+                self.cache.put_many([texts[i] for i in valid],
+                                    self.model_id, predictions)
+        return results
+
+    def classify_news(self, text):
+        """Single-text shortcut for classify_many()."""
+        return self.classify_many([text])[0]
+
+    def combine_signals(self, sentiment_label, confidence, tech_bias=None, timeframe=None, debug=False):
+        """Combine a sentiment prediction with technical bias → (action, confidence)."""
         sentiment_bias = 1 if sentiment_label == "positive" else - \
             1 if sentiment_label == "negative" else 0
 
@@ -54,4 +196,24 @@ class DecisionAgent:
             print(
                 f"⚙️ Combined Decision: {final_action} (confidence={combined_conf:.4f})")
 
-        return final_action, combined_conf, sentiment_label, tech_bias, timeframe
+        return final_action, combined_conf
+
+    def analyze_batch(self, texts, tech_bias=None, timeframe=None, debug=False):
+        """Batch version of analyze(): one result tuple per text, in input order."""
+        results = []
+        for text, (sentiment_label, confidence) in zip(texts, self.classify_many(texts)):
+            if self._is_too_short(text):
+                if debug:
+                    print("⚠️ Skipping empty/short news text")
+                results.append(("HOLD", 1.0, "neutral", tech_bias, timeframe))
+                continue
+
+            final_action, combined_conf = self.combine_signals(
+                sentiment_label, confidence, tech_bias, timeframe, debug)
+            results.append(
+                (final_action, combined_conf, sentiment_label, tech_bias, timeframe))
+        return results
+
+    def analyze(self, text, tech_bias=None, timeframe=None, debug=False):
+        """Analyze news text and combine with technical bias."""
+        return self.analyze_batch([text], tech_bias, timeframe, debug)[0]
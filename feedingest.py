@@ -0,0 +1,355 @@
+# feedingest.py
+"""
+Feed-based news ingestion: list new article URLs from RSS/Atom feeds and
+news sitemaps, then fetch only the articles published since the last run.
+
+Feeds are parsed incrementally while they download (XMLPullParser fed
+chunk by chunk), so a large feed or sitemap stops downloading once it is
+clearly past the stored cursor.
+"""
+import asyncio
+import html
+import re
+import time
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+
+from articleindex import content_hash, get_article_index
+from newscollector import DomainRateLimiter, NewsCollector, client_session
+from urls import COIN_FEEDS
+
+# Elements that each describe one article (or, for "sitemap", a child sitemap)
+_ENTRY_TAGS = {"item", "entry", "url", "sitemap"}
+_TAGS = re.compile(r"<[^>]+>")
+
+
+def _local(tag):
+    """Tag name without its {namespace}."""
+    return tag.rsplit("}", 1)[-1]
+
+
+def parse_date(value):
+    """Epoch seconds from an RFC 822 (RSS) or ISO 8601 (Atom, sitemap) date, or None."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        parsed = parsedate_to_datetime(value)
+    except (TypeError, ValueError, IndexError):
+        parsed = None
+    if parsed is None:
+        try:
+            parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _entry(element):
+    """{"url", "published", "title", "summary", "kind"} for one feed element."""
+    kind = _local(element.tag)
+    fields = {}
+    for child in element.iter():
+        name = _local(child.tag)
+        if name == "link" and child.get("href"):
+            # Atom: prefer rel="alternate" (the default) over self/edit links
+            if child.get("rel", "alternate") == "alternate":
+                fields.setdefault("link", child.get("href"))
+        elif child is not element and child.text and child.text.strip():
+            fields.setdefault(name, child.text.strip())
+
+    url = fields.get("link") or fields.get("loc") or fields.get("guid")
+    published = None
+    for name in ("publication_date", "pubDate", "published", "updated", "date", "lastmod"):
+        published = parse_date(fields.get(name))
+        if published is not None:
+            break
+    summary = fields.get("encoded") or fields.get("description") or fields.get("summary")
+    return {
+        "url": url,
+        "published": published,
+        "title": fields.get("title"),
+        "summary": html.unescape(_TAGS.sub(" ", summary)).strip() if summary else None,
+        "kind": "sitemap" if kind == "sitemap" else "article",
+    }
+
+
+class FeedParser:
+    """
+    Incremental RSS/Atom/sitemap parser: feed() raw chunks as they arrive
+    and collect finished entries from entries(). Elements are cleared once
+    read, so memory stays flat however long the document is.
+    """
+
+    def __init__(self):
+        self._parser = ET.XMLPullParser(events=("end",))
+
+    def feed(self, chunk):
+        self._parser.feed(chunk)
+        return self.entries()
+
+    def entries(self):
+        found = []
+        for _, element in self._parser.read_events():
+            if _local(element.tag) in _ENTRY_TAGS:
+                entry = _entry(element)
+                if entry["url"]:
+                    found.append(entry)
+                element.clear()
+        return found
+
+    def close(self):
+        try:
+            self._parser.close()
+        except ET.ParseError:
+            pass
+        return self.entries()
+
+
+def parse_feed(data):
+    """All entries of a complete feed document (bytes or str)."""
+    parser = FeedParser()
+    return parser.feed(data) + parser.close()
+
+
+class FeedIngestor:
+    """
+    Drop-in alternative to NewsCollector that reads a source's feeds instead
+    of scraping tag pages. Per consumer and feed, the article index keeps a
+    cursor (publish time up to which everything was processed) plus the
+    feed's ETag/Last-Modified; each run fetches only entries newer than the
+    cursor that this consumer has not processed yet, oldest first, at most
+    `max_per_feed` per feed. Like NewsCollector, nothing counts as processed
+    (and no cursor moves) until commit() is called after the results are
+    stored. collect_news_async() returns {url: article_text}, and
+    `published` maps those URLs to their publish timestamps.
+
+    Feeds may be site-wide: with `coin` (or an explicit CoinMatcher) only
+    articles that mention the coin are returned.
+    """
+
+    def __init__(self, feeds=None, coin=None, article_index=None, max_per_feed=25,
+                 lookback=86400, overlap=3600, stale_limit=20, debug=False, consumer=None,
+                 matcher=None):
+        if feeds:
+            self.feeds = list(feeds)
+        elif coin and coin.upper() in COIN_FEEDS:
+            self.feeds = COIN_FEEDS[coin.upper()]
+        else:
+            raise ValueError("No valid feeds provided for FeedIngestor.")
+
+        if matcher is None and coin:
+            from newscorpus import CoinMatcher
+            matcher = CoinMatcher(coins=[coin])
+        self.matcher = matcher
+
+        self.article_index = article_index or get_article_index()
+        self.max_per_feed = max_per_feed
+        # First run with no cursor: only articles from the last `lookback` seconds
+        self.lookback = lookback
+        # Re-list entries this far behind the cursor so late-published ones are seen
+        self.overlap = overlap
+        # Stop reading a feed after this many consecutive entries behind the cursor
+        self.stale_limit = stale_limit
+        self.debug = debug
+        self.consumer = consumer or (coin.upper() if coin else "feeds")
+        self.collector = None
+
+        self.published = {}
+        self.bytes_read = 0
+        self._listed = {}
+        self._new = set()
+        self._fallback = {}
+
+    # ------------------------------------------------------
+    # 📡 Feed listing
+    # ------------------------------------------------------
+    async def _read_feed(self, session, feed_url, limiter, cursor, since):
+        """
+        (entries, validators) for entries newer than `since`; entries is
+        None on failure or 304 Not Modified.
+        """
+        cursor = cursor or {}
+        headers = {}
+        if cursor.get("etag"):
+            headers["If-None-Match"] = cursor["etag"]
+        if cursor.get("last_modified"):
+            headers["If-Modified-Since"] = cursor["last_modified"]
+
+        await limiter.acquire(feed_url)
+        try:
+            async with session.get(feed_url, headers=headers) as resp:
+                if resp.status == 304:
+                    if self.debug:
+                        print(f"♻️ Feed not modified: {feed_url}")
+                    self.article_index.set_feed_cursor(self.consumer, feed_url)
+                    return None, None
+                resp.raise_for_status()
+                validators = (resp.headers.get("ETag"), resp.headers.get("Last-Modified"))
+
+                parser, entries, stale = FeedParser(), [], 0
+                async for chunk in resp.content.iter_chunked(16384):
+                    self.bytes_read += len(chunk)
+                    for entry in parser.feed(chunk):
+                        if entry["published"] is not None and entry["published"] <= since:
+                            stale += 1
+                        else:
+                            stale = 0
+                            entries.append(entry)
+                    if stale >= self.stale_limit:
+                        # Feeds and sitemaps list newest first; the rest is older
+                        break
+                else:
+                    entries.extend(e for e in parser.close()
+                                   if e["published"] is None or e["published"] > since)
+                return entries, validators
+        except (aiohttp.ClientError, asyncio.TimeoutError, ET.ParseError) as e:
+            print(f"⚠️ Feed failed for {feed_url}: {e!r}")
+            return None, None
+
+    async def _list_feed(self, session, feed_url, limiter, depth=0):
+        """Article entries of a feed (and its child sitemaps); cursors are left alone."""
+        cursor = self.article_index.feed_cursor(self.consumer, feed_url)
+        if cursor and cursor["last_published"]:
+            since = cursor["last_published"] - self.overlap
+        else:
+            since = time.time() - self.lookback
+
+        entries, validators = await self._read_feed(session, feed_url, limiter, cursor, since)
+        if entries is None:
+            return []
+
+        articles = [e for e in entries if e["kind"] == "article"]
+        if depth == 0:
+            # Sitemap index: follow child sitemaps modified since the cursor
+            for child in [e for e in entries if e["kind"] == "sitemap"][:self.max_per_feed]:
+                articles.extend(await self._list_feed(session, child["url"], limiter, depth + 1))
+
+        self._listed[feed_url] = {"entries": articles, "validators": validators}
+        if self.debug:
+            print(f"📡 {feed_url}: {len(articles)} entries since {since:.0f}")
+        return articles
+
+    def _select(self, listed):
+        """
+        {url: entry} to fetch: entries this consumer has not processed,
+        oldest first and at most `max_per_feed` per feed, so a backlog is
+        worked through over several runs instead of skipped.
+        """
+        self._new = set(self.article_index.filter_new(
+            list(dict.fromkeys(e["url"] for entries in listed for e in entries)),
+            consumer=self.consumer))
+        selected = {}
+        for feed_entries in listed:
+            fresh = [e for e in feed_entries if e["url"] in self._new and e["url"] not in selected]
+            # Undated entries last: they are re-listed every run anyway
+            fresh.sort(key=lambda e: (e["published"] is None, e["published"] or 0))
+            for entry in fresh[:self.max_per_feed]:
+                selected[entry["url"]] = entry
+        return selected
+
+    def _wanted(self, text):
+        return self.matcher is None or bool(self.matcher.mentions(text))
+
+    # ------------------------------------------------------
+    # ⚡ Collection
+    # ------------------------------------------------------
+    async def stream_news_async(self, concurrency=8, rate=1 / 1.5, timeout=15,
+                                retries=3, backoff=1.0, session=None):
+        """
+        List every feed, then stream (url, article_text) for the new articles
+        as NewsCollector finishes them over the same session. Articles that
+        fail to extract fall back to the feed's own title and summary.
+        """
+        self.published = {}
+        self.collector = None
+        self._listed = {}
+        self._fallback = {}
+        limiter = DomainRateLimiter(rate)
+        own_session = session is None
+        if own_session:
+            session = client_session(concurrency, timeout)
+
+        skipped = 0
+        try:
+            listed = await asyncio.gather(*(
+                self._list_feed(session, feed_url, limiter) for feed_url in self.feeds))
+            entries = self._select(listed)
+            if not entries:
+                return
+
+            collector = self.collector = NewsCollector(
+                urls=list(entries), skip_unchanged=True, article_index=self.article_index,
+                consumer=self.consumer)
+            async for url, text in collector.stream_news_async(
+                    concurrency=concurrency, rate=rate, timeout=timeout,
+                    retries=retries, backoff=backoff, session=session):
+                if not self._wanted(text):
+                    # Processed (and committed) all the same, just not about this coin
+                    skipped += 1
+                    continue
+                self.published[url] = entries[url]["published"]
+                yield url, text
+        finally:
+            if own_session:
+                await session.close()
+
+        for url, entry in entries.items():
+            if url in collector.pending or url in collector.unchanged or not entry["summary"]:
+                continue
+            text = "\n".join(filter(None, [entry["title"], entry["summary"]]))
+            self._fallback[url] = content_hash(text)
+            if not self._wanted(text):
+                skipped += 1
+                continue
+            self.published[url] = entry["published"]
+            yield url, text
+        if self.debug:
+            print(f"📡 {len(self.feeds)} feeds ({self.bytes_read / 1024:.0f} KB) → "
+                  f"{len(entries)} new articles, {len(self.published)} with text"
+                  + (f", {skipped} about other coins" if skipped else ""))
+
+    def commit(self, urls=None):
+        """
+        Mark the last collection's articles (all, or just `urls`) as processed
+        by this consumer and move each feed's cursor past what was processed.
+        Entries that failed, were left out of `urls` or were held back by
+        `max_per_feed` keep the cursor behind them.
+        """
+        keep = (lambda url: True) if urls is None else set(urls).__contains__
+        fallback = {url: digest for url, digest in self._fallback.items() if keep(url)}
+        processed = set(fallback)
+        if self.collector is not None:
+            done = [url for url in self.collector.pending if keep(url)]
+            processed |= set(done) | self.collector.unchanged
+            self.collector.commit(done)
+        self.article_index.mark_consumed(self.consumer, list(fallback.items()))
+
+        for feed_url, listing in self._listed.items():
+            entries = listing["entries"]
+            missing = [e for e in entries if e["url"] in self._new and e["url"] not in processed]
+            if not missing:
+                newest = max((e["published"] for e in entries if e["published"]), default=None)
+                self.article_index.set_feed_cursor(self.consumer, feed_url, newest,
+                                                   *listing["validators"])
+                continue
+            # Keep the stored validators too, or a 304 would hide the missing entries
+            missing_urls = {e["url"] for e in missing}
+            dated = [e["published"] for e in missing if e["published"]]
+            done = [e["published"] for e in entries
+                    if e["published"] and e["url"] not in missing_urls]
+            cursor = min(dated) - 1e-3 if dated else max(done, default=None)
+            self.article_index.set_feed_cursor(self.consumer, feed_url, cursor)
+        self._listed, self._fallback = {}, {}
+
+    async def collect_news_async(self, **kwargs):
+        """{url: article_text} for the new articles; see stream_news_async()."""
+        return {url: text async for url, text in self.stream_news_async(**kwargs)}
+
+    def collect_news(self):
+        return asyncio.run(self.collect_news_async())
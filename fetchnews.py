@@ -1,6 +1,17 @@
-from loadfinbertmodel import tokenizer, model  # GPTNeo
+from modelregistry import get_gptneo  # GPTNeo
 from newspaper import Article
-from tradingagent import TradingAgent  # FinBERT
+from decisionagent import DecisionAgent  # FinBERT
+from calculates import CalculateAgent
+
+# One agent per process; FinBERT itself comes from the shared registry
+_decision_agent = None
+
+
+def get_decision_agent():
+    global _decision_agent
+    if _decision_agent is None:
+        _decision_agent = DecisionAgent()
+    return _decision_agent
 
 
 def summarize_article_with_llm(url):
@@ -13,6 +24,7 @@ def summarize_article_with_llm(url):
     text = article.text
 
     # Summarize with GPTNeo
+    tokenizer, model = get_gptneo()
     inputs = tokenizer(text, return_tensors="pt",
                        truncation=True, max_length=1024)
     outputs = model.generate(
@@ -31,9 +43,14 @@ def analyze_news(url, portfolio_value=1000):
     """Pipeline: Summarize news & make trading decision"""
     summary = summarize_article_with_llm(url)
 
-    # Use TradingAgent (FinBERT) for decision
-    agent = TradingAgent()
-    decision = agent.trading_decision(summary, portfolio_value)
+    # Use the shared DecisionAgent (FinBERT) for decision
+    action, confidence, sentiment, _, _ = get_decision_agent().analyze(summary)
+    decision = {
+        "action": action,
+        "confidence": confidence,
+        "sentiment": sentiment,
+        "amount": CalculateAgent(portfolio_value).position_size(action, confidence),
+    }
 
     return {"summary": summary, "decision": decision}
 
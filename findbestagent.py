@@ -1,23 +1,88 @@
 import yfinance as yf
+import indicators
 from decisionagent import DecisionAgent
 from technicalagent import TechnicalAgent
 from calculates import CalculateAgent
-from transformers import BertTokenizer, BertForSequenceClassification
+from concurrent.futures import ProcessPoolExecutor
 import requests
+import time
+import os
+
+
+# --- Per-process state for the parallel scan (see _init_worker) ---
+_worker = {}
+
+
+def _init_worker(portfolio_value, timeframe, debug, throttle):
+    """Build one TechnicalAgent/CalculateAgent per worker process."""
+    _worker["technical"] = TechnicalAgent(debug=debug)
+    _worker["calc"] = CalculateAgent(portfolio_value)
+    _worker["timeframe"] = timeframe
+    _worker["throttle"] = throttle
+    _worker["last_call"] = 0.0
+
+
+def _scan_worker(coin):
+    """Returns (coin, trade or None, error or None); never raises."""
+    wait = _worker["throttle"] - (time.monotonic() - _worker["last_call"])
+    if wait > 0:
+        time.sleep(wait)
+    _worker["last_call"] = time.monotonic()
+
+    try:
+        technical = _worker["technical"].analyze(coin, _worker["timeframe"])
+        if technical[0] == "UNKNOWN":
+            return coin, None, technical[3]
+        return coin, make_trade(coin, technical, _worker["calc"]), None
+    except Exception as e:
+        return coin, None, f"{type(e).__name__}: {e}"
+
+
+def make_trade(coin, technical, trade_calc):
+    """Turn a technical result into a LONG candidate (bullish coins only)."""
+    tech_bias, strength, tf, reason = technical
+
+    # Only keep coins with clear bullish signal
+    if tech_bias != "BULLISH":
+        return None
+
+    entry, exit_price, stop, current = trade_calc.calculate(coin, "LONG")
+    return {
+        "coin": coin,
+        "bias": tech_bias,
+        "strength": round(strength, 2),
+        "reason": reason,
+        "entry": entry,
+        "exit": exit_price,
+        "stop": stop,
+        "current": current,
+    }
 
 
 class FindBestAgent:
-    def __init__(self, portfolio_value, timeframe="4h", debug=False):
+    """
+    Scans Nobitex markets for bullish coins. Every mode quotes the live
+    price as "current" and places the stop/target at the fixed 3%/5% of
+    CalculateAgent.levels(). With `vol_stops`, the batch scan instead sizes
+    them from each coin's recent volatility (see calculate_batch); it needs
+    the candle panel, so it is only available in the batch scan.
+    """
+
+    def __init__(self, portfolio_value, timeframe="4h", debug=False, batch=True,
+                 workers=1, throttle=0.0, vol_stops=False):
         self.portfolio_value = portfolio_value
         self.timeframe = timeframe
         self.debug = debug
-
-        # Load BERT model & tokenizer once for reuse
-        model_name = "bert-base-uncased"
-        self.tokenizer = BertTokenizer.from_pretrained(model_name)
-        self.model = BertForSequenceClassification.from_pretrained(model_name)
-
-        self.decision_agent = DecisionAgent(self.model, self.tokenizer)
+        self.batch = batch
+        self.workers = workers or os.cpu_count() or 1
+        self.throttle = throttle
+        if vol_stops and (not batch or self.workers > 1):
+            raise ValueError("vol_stops needs the batch scan (batch=True, workers=1)")
+        self.vol_stops = vol_stops
+        self.failures = {}
+
+        # Sentiment model is resolved lazily; the scan itself never needs it
+        self.decision_agent = DecisionAgent()
         self.technical_agent = TechnicalAgent()
         self.trade_calc = CalculateAgent(portfolio_value)
 
@@ -55,28 +120,82 @@ class FindBestAgent:
             print(f"\n📊 Analyzing {ticker}...")
 
         try:
-            tech_bias, strength, tf, reason = self.technical_agent.analyze(
-                coin, self.timeframe)
+            technical = self.technical_agent.analyze(coin, self.timeframe)
         except Exception as e:
             print(f"⚠️ No data for {coin}: {e}")
             return None
 
-        # Only keep coins with clear bullish signal
-        if tech_bias != "BULLISH":
-            return None
+        return self.build_trade(coin, technical)
+
+    # --- Turn a technical result into a trade candidate ---
+    def build_trade(self, coin, technical):
+        return make_trade(coin, technical, self.trade_calc)
+
+    # --- Analyze every coin from one panel ---
+    def scan_batch(self, coins):
+        technical, closes, columns = self.technical_agent.analyze_batch(
+            coins, self.timeframe, return_panel=True)
+        bullish = [c for c in coins if technical[c][0] == "BULLISH" and c in columns]
+        if self.debug:
+            print(f"📊 {len(bullish)} of {len(coins)} coins are bullish")
+        if not bullish:
+            return []
 
-        entry, exit_price, stop, current = self.trade_calc.calculate(
-            coin, "LONG")
-        return {
-            "coin": coin,
-            "bias": tech_bias,
-            "strength": round(strength, 2),
-            "reason": reason,
-            "entry": entry,
-            "exit": exit_price,
-            "stop": stop,
-            "current": current,
+        # Live prices like the per-coin modes; the panel's last close only
+        # stands in for coins missing from the snapshot
+        cols = [columns[c] for c in bullish]
+        live = self.trade_calc.latest_prices(bullish)
+        table = {
+            "coin": bullish,
+            "action": "LONG",
+            "confidence": [technical[c][1] for c in bullish],
+            "current_price": [live[c] or close for c, close in zip(bullish, closes[-1, cols])],
         }
+        if self.vol_stops:
+            table["volatility"] = indicators.volatility(closes[:, cols])[-1]
+        levels = self.trade_calc.calculate_batch(table)
+        return [{
+            "coin": row.coin,
+            "bias": technical[row.coin][0],
+            "strength": round(technical[row.coin][1], 2),
+            "reason": technical[row.coin][3],
+            "entry": row.entry_price,
+            "exit": row.exit_price,
+            "stop": row.stop_loss,
+            "current": row.current_price,
+            "size": row.size,
+        } for row in levels.itertuples(index=False)]
+
+    # --- Analyze coins across a process pool ---
+    def scan_parallel(self, coins):
+        """
+        Scan coins on `self.workers` processes. Each worker reuses its own
+        agents and waits at least `self.throttle` seconds between coins.
+        Results keep the input order; per-coin errors land in self.failures.
+        """
+        self.failures = {}
+        chunksize = max(1, len(coins) // (self.workers * 4))
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(self.portfolio_value, self.timeframe,
+                      self.debug, self.throttle),
+        ) as pool:
+            outcomes = list(pool.map(_scan_worker, coins, chunksize=chunksize))
+
+        trades = []
+        for coin, trade, error in outcomes:
+            if error:
+                self.failures[coin] = error
+            elif trade:
+                trades.append(trade)
+
+        if self.failures:
+            print(f"⚠️ {len(self.failures)} coins failed during the scan.")
+            if self.debug:
+                for coin, error in self.failures.items():
+                    print(f"   {coin}: {error}")
+        return trades
 
     # --- Main runner ---
     def run(self):
@@ -87,11 +206,16 @@ class FindBestAgent:
 
         print(f"📈 Checking {len(coins)} coins from Nobitex...")
 
-        best_trades = []
-        for coin in coins:
-            result = self.analyze_coin(coin)
-            if result:
-                best_trades.append(result)
+        if self.workers > 1:
+            best_trades = self.scan_parallel(coins)
+        elif self.batch:
+            best_trades = [r for r in self.scan_batch(coins) if r]
+        else:
+            best_trades = []
+            for coin in coins:
+                result = self.analyze_coin(coin)
+                if result:
+                    best_trades.append(result)
 
         if not best_trades:
             print("⚠️ No bullish coins found.")
@@ -0,0 +1,170 @@
+# htmlparse.py
+"""
+Small, fast HTML queries for search result pages and article fallbacks.
+
+With lxml installed, pages are parsed by libxml2 and queried with XPath.
+Otherwise BeautifulSoup's pure-Python parser is used, restricted with a
+SoupStrainer so only the needed tags are built into the tree.
+"""
+import argparse
+import base64
+import binascii
+import re
+import time
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    import lxml.etree
+    import lxml.html
+    HAS_LXML = True
+except ImportError:
+    HAS_LXML = False
+
+PARSER = "lxml" if HAS_LXML else "html.parser"
+
+BING_REDIRECT = re.compile(r"u=a1([^&]+)")
+
+_LINKS = SoupStrainer("a", href=True)
+_PARAGRAPHS = SoupStrainer("p")
+_HEAD = SoupStrainer(["title", "meta"])
+_CANONICAL = SoupStrainer("link", rel="canonical")
+
+
+def _document(html):
+    """lxml tree for `html`, or None for empty/unparseable input."""
+    if not html or not html.strip():
+        return None
+    try:
+        try:
+            return lxml.html.document_fromstring(html)
+        except ValueError:
+            # str input that still carries an <?xml encoding=...?> declaration
+            return lxml.html.document_fromstring(html.encode("utf-8"))
+    except lxml.etree.ParserError:
+        return None
+
+
+def links(html):
+    """Every <a href> value in document order."""
+    if HAS_LXML:
+        doc = _document(html)
+        return [str(h) for h in doc.xpath("//a/@href")] if doc is not None else []
+    soup = BeautifulSoup(html, "html.parser", parse_only=_LINKS)
+    return [a.get("href") for a in soup.find_all("a", href=True)]
+
+
+def paragraph_text(html):
+    """Text of every <p>, one per line."""
+    if HAS_LXML:
+        doc = _document(html)
+        paragraphs = [p.text_content() for p in doc.iter("p")] if doc is not None else []
+    else:
+        soup = BeautifulSoup(html, "html.parser", parse_only=_PARAGRAPHS)
+        paragraphs = [p.get_text() for p in soup.find_all("p")]
+    return "\n".join(paragraphs).strip()
+
+
+def title_and_description(html):
+    """(<title>, og:description or meta description), either may be None."""
+    if HAS_LXML:
+        doc = _document(html)
+        if doc is None:
+            return None, None
+        title = doc.findtext(".//title")
+        description = None
+        for query in ('//meta[@property="og:description"]/@content',
+                      '//meta[@name="description"]/@content'):
+            found = doc.xpath(query)
+            if found and str(found[0]).strip():
+                description = str(found[0])
+                break
+        return title, description
+
+    soup = BeautifulSoup(html, "html.parser", parse_only=_HEAD)
+    title = soup.title.string if soup.title else None
+    description = None
+    for attrs in ({"property": "og:description"}, {"name": "description"}):
+        tag = soup.find("meta", attrs=attrs)
+        if tag and tag.get("content"):
+            description = tag["content"]
+            break
+    return title, description
+
+
+def canonical_link(html):
+    """href of <link rel="canonical">, or None."""
+    if HAS_LXML:
+        doc = _document(html)
+        found = doc.xpath('//link[@rel="canonical"]/@href') if doc is not None else []
+        return str(found[0]).strip() or None if found else None
+    soup = BeautifulSoup(html, "html.parser", parse_only=_CANONICAL)
+    tag = soup.find("link", href=True)
+    return tag["href"].strip() or None if tag else None
+
+
+def decode_bing_url(raw_url):
+    """Target URL of a bing.com/ck/a redirect link, or None."""
+    match = BING_REDIRECT.search(raw_url)
+    if not match:
+        return None
+    encoded = match.group(1)
+    try:
+        # Bing uses unpadded URL-safe base64
+        return base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)).decode("utf-8")
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+# ------------------------------------------------------
+# ⏱️ Micro-benchmark against the full html.parser tree
+# ------------------------------------------------------
+def _sample_page(paragraphs=400, anchors=400):
+    body = "".join(
+        f"<div class='c'><p>Paragraph {i} about <b>bitcoin</b> markets and "
+        f"<a href='https://www.coindesk.com/markets/{i}'>link {i}</a>.</p></div>"
+        for i in range(max(paragraphs, anchors)))
+    return (f"<html><head><title>Sample</title><meta name='description' "
+            f"content='Sample page for the parser benchmark'></head><body>{body}</body></html>")
+
+
+def benchmark(pages, repeat=5):
+    """Print ms per page for each query on the fast path vs a full html.parser tree."""
+    baselines = {
+        "links": lambda h: [a.get("href") for a in
+                            BeautifulSoup(h, "html.parser").find_all("a", href=True)],
+        "paragraph_text": lambda h: "\n".join(
+            p.get_text() for p in BeautifulSoup(h, "html.parser").find_all("p")).strip(),
+    }
+    fast = {"links": links, "paragraph_text": paragraph_text}
+
+    print(f"⏱️ Parser: {PARSER}, {len(pages)} page(s), "
+          f"{sum(map(len, pages)) / len(pages) / 1024:.0f} KB average")
+    for name in fast:
+        timings = {}
+        for label, fn in (("html.parser", baselines[name]), (PARSER + " (fast)", fast[name])):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                for html in pages:
+                    fn(html)
+            timings[label] = (time.perf_counter() - start) * 1000 / (repeat * len(pages))
+        base, quick = timings.values()
+        print(f"   {name:15s} html.parser {base:8.2f} ms → {quick:8.2f} ms "
+              f"({base / quick if quick else float('inf'):.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="HTML parsing helpers")
+    parser.add_argument("--bench", nargs="*", metavar="PAGE",
+                        help="Benchmark on saved HTML pages (a generated page if none given)")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.bench is not None:
+        pages = []
+        for path in args.bench:
+            with open(path, encoding="utf-8", errors="replace") as f:
+                pages.append(f.read())
+        benchmark(pages or [_sample_page()], args.repeat)
+    else:
+        parser.print_help()
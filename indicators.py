@@ -0,0 +1,94 @@
+# indicators.py
+"""
+Column-wise indicator math on (bars x coins) NumPy panels.
+
+Every function accepts a 1-D array (one coin) or a 2-D array with one column
+per coin and returns the same shape. Panels are right-aligned with
+`right_align`, so row -1 is the latest bar of every coin and each column sees
+exactly the bars it would see on its own.
+"""
+import numpy as np
+import pandas as pd
+
+
+def _as_2d(values):
+    values = np.asarray(values, dtype=float)
+    return (values.reshape(-1, 1), True) if values.ndim == 1 else (values, False)
+
+
+def _restore(values, squeeze):
+    return values[:, 0] if squeeze else values
+
+
+def right_align(series_list) -> np.ndarray:
+    """Stack 1-D series of different lengths into a NaN-padded (T, N) panel."""
+    length = max((len(s) for s in series_list), default=0)
+    panel = np.full((length, len(series_list)), np.nan)
+    for j, s in enumerate(series_list):
+        if len(s):
+            panel[length - len(s):, j] = np.asarray(s, dtype=float)
+    return panel
+
+
+def sma(values, window: int):
+    values, squeeze = _as_2d(values)
+    out = pd.DataFrame(values).rolling(window).mean().to_numpy()
+    return _restore(out, squeeze)
+
+
+def rsi(values, period: int = 14):
+    """Simple-average RSI, matching TechnicalAgent.analyze."""
+    values, squeeze = _as_2d(values)
+    delta = np.diff(values, axis=0, prepend=np.nan)
+    present = ~np.isnan(values)
+    # First bar of each series has no delta and counts as a zero move
+    gain = np.where(present, np.where(delta > 0, delta, 0.0), np.nan)
+    loss = np.where(present, np.where(delta < 0, -delta, 0.0), np.nan)
+    avg_gain = pd.DataFrame(gain).rolling(period).mean().to_numpy()
+    avg_loss = pd.DataFrame(loss).rolling(period).mean().to_numpy()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        out = 100 - (100 / (1 + rs))
+    return _restore(out, squeeze)
+
+
+def ema(values, span: int):
+    """
+    EMA seeded with the SMA of each column's first `span` values, then
+    ewm(adjust=False) — the same convention pandas_ta uses.
+    """
+    values, squeeze = _as_2d(values)
+    rows, cols = values.shape
+    out = np.full_like(values, np.nan)
+    if rows == 0:
+        return _restore(out, squeeze)
+
+    valid = ~np.isnan(values)
+    first = np.where(valid.any(axis=0), valid.argmax(axis=0), rows)
+    seed_row = first + span - 1
+    seed = pd.DataFrame(values).rolling(span).mean().to_numpy()
+    alpha = 2.0 / (span + 1)
+
+    prev = np.full(cols, np.nan)
+    for t in range(rows):
+        prev = np.where(seed_row == t, seed[t],
+                        alpha * values[t] + (1 - alpha) * prev)
+        out[t] = prev
+    return _restore(out, squeeze)
+
+
+def macd(values, fast: int = 12, slow: int = 26, signal: int = 9):
+    """Return (macd_line, signal_line)."""
+    values, squeeze = _as_2d(values)
+    line = ema(values, fast) - ema(values, slow)
+    signal_line = ema(line, signal)
+    return _restore(line, squeeze), _restore(signal_line, squeeze)
+
+
+def volatility(values, window: int = 20):
+    """Rolling standard deviation of bar-to-bar returns (a fraction of price)."""
+    values, squeeze = _as_2d(values)
+    returns = np.full_like(values, np.nan)
+    returns[1:] = values[1:] / values[:-1] - 1
+    out = pd.DataFrame(returns).rolling(window).std().to_numpy()
+    return _restore(out, squeeze)
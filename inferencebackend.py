@@ -0,0 +1,194 @@
+# inferencebackend.py
+import argparse
+import os
+import time
+
+import numpy as np
+import torch
+
+from modelregistry import get_finbert, registry
+
+ONNX_EXPORT_DIR = "data/finbert-onnx"
+BACKENDS = ("eager", "int8", "onnx")
+
+# Short crypto headlines used by the agreement check
+SAMPLE_TEXTS = [
+    "Bitcoin surges past resistance as spot ETF inflows hit a record high this week.",
+    "Ethereum slides after a major exchange reports a multi-million dollar hack.",
+    "BNB trades sideways while traders wait for the next Federal Reserve decision.",
+    "Solana network suffers another outage, raising concerns among developers.",
+    "Cardano announces a new partnership to expand blockchain education in Africa.",
+    "Regulators sue a crypto lender, alleging it misled investors about risks.",
+    "Analysts expect Bitcoin volatility to stay low ahead of the halving.",
+    "Institutional demand lifts Ethereum staking deposits to an all-time high.",
+]
+
+
+class TorchBackend:
+    """Runs a PyTorch sequence-classification model (fp32 or quantized)."""
+
+    def __init__(self, name, model, tokenizer):
+        self.name = name
+        self.model = model
+        self.tokenizer = tokenizer
+        self.model.eval()
+
+    def logits(self, inputs):
+        with torch.inference_mode():
+            return self.model(**inputs).logits
+
+
+class OnnxBackend:
+    """Runs an exported model through ONNX Runtime on the CPU."""
+
+    def __init__(self, export_dir=ONNX_EXPORT_DIR, filename="model.onnx"):
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+
+        path = os.path.join(export_dir, filename)
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"{path} not found; run `python inferencebackend.py export` first")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.name = "onnx"
+        self.session = ort.InferenceSession(
+            path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.tokenizer = AutoTokenizer.from_pretrained(export_dir)
+
+    def logits(self, inputs):
+        feed = {name: tensor.cpu().numpy().astype(np.int64)
+                for name, tensor in inputs.items() if name in self.input_names}
+        return torch.from_numpy(self.session.run(["logits"], feed)[0])
+
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every Linear layer."""
+    return torch.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def load_backend(name, model=None, tokenizer=None):
+    """
+    Build the requested backend. Without an explicit model the shared
+    registry entries are used. Any failure falls back to eager PyTorch.
+    """
+    try:
+        if name == "onnx":
+            return registry.get("finbert-onnx")
+        if name == "int8":
+            if model is None:
+                model, tokenizer = registry.get("finbert-int8")
+            else:
+                model = quantize_int8(model)
+            return TorchBackend("int8", model, tokenizer)
+        if name != "eager":
+            raise ValueError(f"Unknown backend: {name}")
+    except Exception as e:
+        print(f"⚠️ {name} backend unavailable ({e}); falling back to eager PyTorch.")
+
+    if model is None:
+        model, tokenizer = get_finbert()
+    return TorchBackend("eager", model, tokenizer)
+
+
+# ------------------------------------------------------
+# 🛠️ One-time export and agreement check
+# ------------------------------------------------------
+class _LogitsOnly(torch.nn.Module):
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask, token_type_ids=None):
+        return self.model(input_ids=input_ids, attention_mask=attention_mask,
+                          token_type_ids=token_type_ids).logits
+
+
+def export_onnx(export_dir=ONNX_EXPORT_DIR, quantize=False, opset=14):
+    """Export FinBERT (and its tokenizer) for the onnx backend."""
+    model, tokenizer = get_finbert()
+    model.eval()
+    os.makedirs(export_dir, exist_ok=True)
+
+    sample = tokenizer(SAMPLE_TEXTS[:2], return_tensors="pt", padding=True)
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids")
+                   if n in sample]
+    dynamic_axes = {n: {0: "batch", 1: "sequence"} for n in input_names}
+    dynamic_axes["logits"] = {0: "batch"}
+
+    path = os.path.join(export_dir, "model.onnx")
+    torch.onnx.export(
+        _LogitsOnly(model),
+        tuple(sample[n] for n in input_names),
+        path,
+        input_names=input_names,
+        output_names=["logits"],
+        dynamic_axes=dynamic_axes,
+        opset_version=opset,
+    )
+    tokenizer.save_pretrained(export_dir)
+    print(f"✅ Exported ONNX model to {path}")
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantized = os.path.join(export_dir, "model.int8.onnx")
+        quantize_dynamic(path, quantized, weight_type=QuantType.QInt8)
+        os.replace(path, os.path.join(export_dir, "model.fp32.onnx"))
+        os.replace(quantized, path)
+        print("✅ Quantized ONNX model to int8 (fp32 kept as model.fp32.onnx)")
+    return path
+
+
+def check_agreement(backend, texts=None):
+    """Compare a backend against fp32 eager PyTorch on the same texts."""
+    from decisionagent import DecisionAgent
+
+    texts = texts or SAMPLE_TEXTS
+    reference = DecisionAgent(backend="eager")
+    candidate = DecisionAgent(backend=backend)
+
+    start = time.perf_counter()
+    expected = reference._predict(texts)
+    reference_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = candidate._predict(texts)
+    candidate_seconds = time.perf_counter() - start
+
+    agree = sum(e[0] == a[0] for e, a in zip(expected, actual))
+    max_diff = max(float(np.max(np.abs(np.array(e[2]) - np.array(a[2]))))
+                   for e, a in zip(expected, actual))
+    result = {
+        "backend": candidate.backend.name,
+        "agreement": agree / len(texts),
+        "max_prob_diff": max_diff,
+        "eager_seconds": round(reference_seconds, 3),
+        "backend_seconds": round(candidate_seconds, 3),
+    }
+    print(f"🔍 {result['backend']} vs eager: {agree}/{len(texts)} labels agree, "
+          f"max prob diff {max_diff:.4f}, "
+          f"{reference_seconds:.2f}s → {candidate_seconds:.2f}s")
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="FinBERT inference backends (export / agreement check)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    export_cmd = sub.add_parser("export", help="Export FinBERT to ONNX")
+    export_cmd.add_argument("--output", default=ONNX_EXPORT_DIR)
+    export_cmd.add_argument("--quantize", action="store_true",
+                            help="Also apply ONNX Runtime dynamic int8 quantization")
+
+    check_cmd = sub.add_parser("check", help="Compare a backend with fp32 eager")
+    check_cmd.add_argument("--backend", choices=BACKENDS, default="int8")
+
+    args = parser.parse_args()
+    if args.command == "export":
+        export_onnx(args.output, quantize=args.quantize)
+    else:
+        check_agreement(args.backend)
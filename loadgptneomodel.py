@@ -1,15 +1,10 @@
-# loadfinbertmodel.py
+# loadgptneomodel.py
 
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
+from transformers import AutoTokenizer, AutoModelForCausalLM
 
 
-def load_finbert():
-    """Load FinBERT model and tokenizer from local path"""
-    model_path = r"G:\AI Projects\Sarva\model\GPTNeo"
+def load_gptneo(model_path=r"G:\AI Projects\Sarva\model\GPTNeo"):
+    """Load GPT-Neo model and tokenizer from local path"""
     tokenizer = AutoTokenizer.from_pretrained(model_path)
-    model = AutoModelForSequenceClassification.from_pretrained(model_path)
+    model = AutoModelForCausalLM.from_pretrained(model_path)
     return tokenizer, model
-
-
-# Load them once when the module is imported
-tokenizer, model = load_finbert()
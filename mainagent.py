@@ -1,105 +1,216 @@
 import argparse
+import asyncio
+import os
 from decisionagent import DecisionAgent
 from technicalagent import TechnicalAgent
 from newscollector import NewsCollector
+from feedingest import FeedIngestor
 from calculates import CalculateAgent
 from findbestagent import FindBestAgent
+from neardup import NearDuplicateIndex
+from sentimentcache import get_sentiment_cache
 from datetime import datetime
 
 
 class MainAgent:
-    def __init__(self, coin_name, portfolio_value, timeframe="4h", debug=False, report=False):
+    def __init__(self, coin_name, portfolio_value, timeframe="4h", debug=False, report=False,
+                 sentiment_backend=None, technical_agent=None, decision_agent=None,
+                 trade_calc=None, db=None, feeds=False):
         self.coin_name = coin_name.upper()
         self.portfolio_value = portfolio_value
         self.timeframe = timeframe
         self.debug = debug
         self.report = report
 
-        self.technical_agent = TechnicalAgent()
-        self.decision_agent = DecisionAgent()
-        self.trade_calc = CalculateAgent(portfolio_value)
+        # Agents can be shared (e.g. by the daemon) so models and caches stay warm
+        self.technical_agent = technical_agent or TechnicalAgent()
+        self.decision_agent = decision_agent or DecisionAgent(
+            cache=get_sentiment_cache(), backend=sentiment_backend)
+        self.trade_calc = trade_calc or CalculateAgent(portfolio_value)
+        self.db = db
+        self.feeds = feeds
 
-        # Initialize NewsCollector for this specific coin
-        self.news_collector = NewsCollector(coin=self.coin_name)
+        # One NewsCollector per coin, reused across runs; each streaming run
+        # opens its own pooled aiohttp session
+        self.news_collectors = {}
+        self.news_collector = self.get_news_collector(self.coin_name)
 
         print(
             f"🪙 Initializing MainAgent for {self.coin_name} (Timeframe: {self.timeframe})")
 
-    def analyze_coin(self, coin):
+    def get_news_collector(self, coin):
+        coin = coin.upper()
+        if coin not in self.news_collectors:
+            self.news_collectors[coin] = (
+                FeedIngestor(coin=coin, debug=self.debug) if self.feeds else NewsCollector(coin=coin))
+        return self.news_collectors[coin]
+
+    def analyze_coin(self, coin, news_texts=None, on_result=None):
+        return asyncio.run(self.analyze_coin_async(coin, news_texts, on_result))
+
+    async def analyze_coin_async(self, coin, news_texts=None, on_result=None,
+                                 batch_size=16, queue_size=64):
+        """
+        Staged pipeline: technical analysis, the price fetch and news
+        collection start together; articles stream through a bounded queue
+        into sentiment micro-batches, and each result is emitted (printed,
+        saved, passed to `on_result`) as soon as it is decided. Trade levels
+        come from one price fetch per coin.
+        """
         if self.debug:
             print(f"🔎 Starting analysis for {coin}...")
 
-        # ---- Step 1: Technical Analysis ----
-        tech_bias, strength, tf, reason = self.technical_agent.analyze(
-            coin, self.timeframe)
+        # ---- Step 1: Technical Analysis + price, in the background ----
+        tech_task = asyncio.ensure_future(
+            asyncio.to_thread(self.technical_agent.analyze, coin, self.timeframe))
+        price_task = asyncio.ensure_future(
+            asyncio.to_thread(self.trade_calc.fetch_price, coin))
+
+        # ---- Step 2: Stream News (unless a shared corpus already collected it) ----
+        queue = asyncio.Queue(maxsize=queue_size)
+        producer = asyncio.ensure_future(self._produce_news(coin, news_texts, queue))
+
+        # ---- Steps 3-4: Sentiment micro-batches → decisions ----
+        try:
+            results = await self._consume_news(
+                coin, queue, tech_task, price_task, batch_size, on_result)
+            await producer
+            tech_bias, strength, tf, reason = await tech_task
+        finally:
+            # On failure nothing may outlive the run, and every outcome is
+            # retrieved so a failed task never logs "exception was never retrieved"
+            for task in (producer, tech_task, price_task):
+                task.cancel()
+            await asyncio.gather(producer, tech_task, price_task, return_exceptions=True)
         if self.debug:
             print(
                 f"📊 Technical bias: {tech_bias} ({strength:.2f}) [{tf}] → {reason}")
 
-        # ---- Step 2: Collect News ----
-        news_collector = NewsCollector(coin)
-        news_texts = news_collector.collect_news()
-        if not news_texts:
+        if self.db:
+            self.db.save_technical(coin, tf, tech_bias, strength, reason)
+            # End of the run: write the buffered rows instead of waiting for the next write
+            self.db.flush()
+        if news_texts is None:
+            # Results are stored; only now count these pages as processed
+            self.get_news_collector(coin).commit()
+        if not results:
             print(f"⚠️ No news articles for {coin}.")
             return None
 
-        if self.debug:
-            print(f"📰 Collected {len(news_texts)} news articles for {coin}")
+        # ---- Step 5: Reporting ----
+        if self.report:
+            self.save_report(results, coin)
+        return results
 
-        # ---- Step 3: Analyze Sentiment ----
-        combined_results = []
-        for url, text in news_texts.items():
-            if self.debug:
-                print(f"\n🧠 Analyzing news sentiment for: {url}")
+    async def _produce_news(self, coin, news_texts, queue):
+        try:
+            if news_texts is not None:
+                for item in news_texts.items():
+                    await queue.put(item)
+            else:
+                async for item in self.get_news_collector(coin).stream_news_async():
+                    await queue.put(item)
+        finally:
+            await queue.put(None)
 
-            sentiment, confidence = self.decision_agent.classify_news(text)
+    async def _next_batch(self, queue, batch_size):
+        """Wait for one article, then take whatever else is queued (up to batch_size)."""
+        item = await queue.get()
+        if item is None:
+            return [], True
+        batch = [item]
+        while len(batch) < batch_size:
+            try:
+                item = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
 
-            if self.debug:
-                print(f"🧠 DEBUG SENTIMENT ANALYSIS")
-                print(
-                    f"📰 Sentiment: {sentiment.upper()} (confidence={confidence:.4f})")
-                print(f"📈 Technical Bias: {tech_bias} [{tf}]")
+    async def _consume_news(self, coin, queue, tech_task, price_task, batch_size, on_result):
+        # Syndicated copies of one story are scored and stored once
+        near_duplicates = NearDuplicateIndex()
+        # duplicates: representative → copies; representative: url → its story's representative
+        results, duplicates, representative, levels = [], {}, {}, {}
+        done = False
+        while not done:
+            batch, done = await self._next_batch(queue, batch_size)
+            fresh = []
+            for url, text in batch:
+                matches = near_duplicates.add(url, text)
+                if matches:
+                    # The best match may itself be a copy folded into another story
+                    rep = representative[url] = representative[matches[0][0]]
+                    duplicates[rep].append(url)
+                else:
+                    representative[url] = url
+                    duplicates[url] = []
+                    fresh.append((url, text))
+            if not fresh:
+                continue
 
-            # Combine sentiment + technical
-            action, final_conf = self.decision_agent.combine_signals(
-                sentiment, confidence, tech_bias, strength
-            )
+            # The model runs off the loop while the next batch queues up
+            sentiments = await asyncio.to_thread(
+                self.decision_agent.classify_many, [text for _, text in fresh])
+            tech_bias, strength, tf, reason = await tech_task
+            current_price = await price_task
 
-            if self.debug:
-                print(
-                    f"⚙️ Combined Decision: {action.upper()} ({final_conf*100:.2f}%)")
+            for (url, text), (sentiment, confidence) in zip(fresh, sentiments):
+                if self.debug:
+                    print(f"\n🧠 DEBUG SENTIMENT ANALYSIS for: {url}")
+                    print(
+                        f"📰 Sentiment: {sentiment.upper()} (confidence={confidence:.4f})")
+                    print(f"📈 Technical Bias: {tech_bias} [{tf}]")
 
-            # ---- Step 4: Trading Calculation ----
-            entry_price, exit_price, stop_loss, current_price = self.trade_calc.calculate(
-                coin, action
-            )
+                # Combine sentiment + technical
+                action, final_conf = self.decision_agent.combine_signals(
+                    sentiment, confidence, tech_bias, tf
+                )
 
-            result = {
-                "url": url,
-                "decision": {
-                    "action": action,
-                    "confidence": round(final_conf, 4),
-                    "amount": round((self.portfolio_value * final_conf) / 5, 2),
-                    "entry_price": entry_price,
-                    "exit_price": exit_price,
-                    "stop_loss": stop_loss,
-                    "current_price": current_price,
-                    "sentiment": sentiment,
-                    "technical": tech_bias,
-                },
-            }
-
-            combined_results.append(result)
+                if self.debug:
+                    print(
+                        f"⚙️ Combined Decision: {action.upper()} ({final_conf*100:.2f}%)")
 
-        # ---- Step 5: Reporting ----
-        self.display_results(combined_results)
-        if self.report:
-            self.save_report(combined_results, coin)
+                # Trading levels: one price per coin, one calculation per action
+                if action not in levels:
+                    levels[action] = self.trade_calc.levels(current_price, action)
+                entry_price, exit_price, stop_loss, current = levels[action]
+
+                result = {
+                    "url": url,
+                    "duplicates": duplicates[url],
+                    "decision": {
+                        "action": action,
+                        "confidence": round(final_conf, 4),
+                        "amount": round((self.portfolio_value * final_conf) / 5, 2),
+                        "entry_price": entry_price,
+                        "exit_price": exit_price,
+                        "stop_loss": stop_loss,
+                        "current_price": current,
+                        "sentiment": sentiment,
+                        "technical": tech_bias,
+                    },
+                }
+                results.append(result)
+
+                if self.db:
+                    self.db.save_news(
+                        coin, url, sentiment, confidence, action,
+                        result["decision"]["amount"], text,
+                        entry_price, exit_price, stop_loss, tech_bias, tf)
 
-        return combined_results
+                if len(results) == 1:
+                    print("\n✅ FINAL DECISIONS")
+                self.display_results([result], header=False)
+                if on_result:
+                    on_result(result)
+        return results
 
-    def display_results(self, results):
-        print("\n✅ FINAL DECISIONS")
+    def display_results(self, results, header=True):
+        if header:
+            print("\n✅ FINAL DECISIONS")
         for res in results:
             d = res["decision"]
             print(
@@ -138,17 +249,64 @@ if __name__ == "__main__":
                         help="Save report to file")
     parser.add_argument("--findbest", action="store_true",
                         help="Find best coin for long position")
+    parser.add_argument("--backend", choices=["eager", "int8", "onnx"],
+                        help="Sentiment inference backend (default: eager)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Worker processes for --findbest (0 = all cores)")
+    parser.add_argument("--throttle", type=float, default=0.0,
+                        help="Minimum seconds between coins per worker")
+    parser.add_argument("--vol-stops", action="store_true",
+                        help="In --findbest, scale stops/targets by each coin's volatility")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Stay running and analyze after every timeframe candle close")
+    parser.add_argument("--coins", nargs="+",
+                        help="Coins analyzed each cycle in --daemon mode")
+    parser.add_argument("--delay", type=int, default=30,
+                        help="Seconds after the candle close to start a --daemon cycle")
+    parser.add_argument("--run-now", action="store_true",
+                        help="In --daemon mode, also run once immediately at startup")
+    parser.add_argument("--feeds", action="store_true",
+                        help="Read news from RSS/Atom feeds and sitemaps instead of tag pages")
+    parser.add_argument("--sentiment-server", metavar="ADDRESS",
+                        help="Score sentiment on a running sentimentserver.py "
+                             "(socket path or host:port); falls back to the local model")
 
     args = parser.parse_args()
+    if args.sentiment_server:
+        # Read by every DecisionAgent, including --findbest worker processes
+        os.environ["SARVA_SENTIMENT_SERVER"] = args.sentiment_server
+
+    # ---- Long-running daemon ----
+    if args.daemon:
+        from daemon import AnalysisDaemon
+
+        coins = args.coins or ([args.coin] if args.coin else None)
+        if not coins:
+            parser.error("--coins (or --coin) is required with --daemon")
+
+        AnalysisDaemon(
+            coins=coins,
+            portfolio_value=args.portfolio,
+            timeframe=args.timeframe,
+            delay=args.delay,
+            debug=args.debug,
+            report=args.report,
+            sentiment_backend=args.backend,
+            run_now=args.run_now,
+            feeds=args.feeds,
+        ).run()
 
     # ---- Find Best Coin ----
-    if args.findbest:
+    elif args.findbest:
         from findbestagent import FindBestAgent
 
         finder = FindBestAgent(
             portfolio_value=args.portfolio,
             timeframe=args.timeframe,
             debug=args.debug,
+            workers=args.workers,
+            throttle=args.throttle,
+            vol_stops=args.vol_stops,
         )
         finder.run()
     else:
@@ -162,5 +320,7 @@ if __name__ == "__main__":
             timeframe=args.timeframe,
             debug=args.debug,
             report=args.report,
+            sentiment_backend=args.backend,
+            feeds=args.feeds,
         )
         agent.run()
@@ -0,0 +1,106 @@
+# modelregistry.py
+import threading
+import time
+
+
+def _param_bytes(value):
+    """Bytes held by parameters and buffers of any torch modules in `value`."""
+    objects = value if isinstance(value, (tuple, list)) else (value,)
+    total = 0
+    for obj in objects:
+        if hasattr(obj, "parameters") and hasattr(obj, "buffers"):
+            for tensor in list(obj.parameters()) + list(obj.buffers()):
+                total += tensor.numel() * tensor.element_size()
+    return total
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of lazily loaded models. Loaders run on the first
+    get() and the result is shared by every caller in the process. Each
+    name has its own load lock, so a loader may get() other models (e.g.
+    the int8 loader quantizing the shared fp32 FinBERT).
+    """
+
+    def __init__(self):
+        self._loaders = {}
+        self._models = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._load_locks = {}
+
+    def _load_lock(self, name):
+        with self._lock:
+            return self._load_locks.setdefault(name, threading.Lock())
+
+    def register(self, name, loader):
+        self._loaders[name] = loader
+
+    def get(self, name):
+        if name in self._models:
+            return self._models[name]
+
+        if name not in self._loaders:
+            raise KeyError(f"Unknown model: {name}")
+        with self._load_lock(name):
+            if name not in self._models:
+                start = time.perf_counter()
+                value = self._loaders[name]()
+                self._stats[name] = {
+                    "load_seconds": round(time.perf_counter() - start, 3),
+                    "param_mb": round(_param_bytes(value) / 2**20, 1),
+                }
+                self._models[name] = value
+                print(f"🧠 Loaded {name} in {self._stats[name]['load_seconds']:.2f}s "
+                      f"({self._stats[name]['param_mb']} MB)")
+        return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+    def unload(self, name):
+        with self._load_lock(name):
+            self._models.pop(name, None)
+            self._stats.pop(name, None)
+
+    def stats(self):
+        """{name: {"load_seconds", "param_mb"}} for every loaded model."""
+        return {name: dict(stats) for name, stats in self._stats.items()}
+
+
+def _load_finbert():
+    from loadfinbertmodel import load_finbert
+    return load_finbert()
+
+
+def _load_finbert_int8():
+    from inferencebackend import quantize_int8
+    model, tokenizer = get_finbert()
+    return quantize_int8(model), tokenizer
+
+
+def _load_finbert_onnx():
+    from inferencebackend import OnnxBackend
+    return OnnxBackend()
+
+
+def _load_gptneo():
+    from loadgptneomodel import load_gptneo
+    return load_gptneo()
+
+
+registry = ModelRegistry()
+registry.register("finbert", _load_finbert)
+registry.register("finbert-int8", _load_finbert_int8)
+registry.register("finbert-onnx", _load_finbert_onnx)
+registry.register("gptneo", _load_gptneo)
+
+
+def get_finbert():
+    """Shared (model, tokenizer) for FinBERT."""
+    return registry.get("finbert")
+
+
+def get_gptneo():
+    """Shared (tokenizer, model) for GPT-Neo."""
+    return registry.get("gptneo")
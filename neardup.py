@@ -0,0 +1,265 @@
+# neardup.py
+import os
+import string
+import unicodedata
+import zipfile
+import zlib
+from collections import OrderedDict
+
+import numpy as np
+
+NEARDUP_INDEX_FILE = "data/neardup_index.npz"
+
+# Punctuation becomes a separator, so tokenizing is str.split()
+_PUNCTUATION = str.maketrans({c: " " for c in string.punctuation + "“”‘’«»—–…"})
+_EMPTY = np.uint32(0xFFFFFFFF)
+
+
+def _mix64(x):
+    """splitmix64 finalizer, vectorized over a uint64 array."""
+    x = x ^ (x >> np.uint64(30))
+    x = x * np.uint64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> np.uint64(27))
+    x = x * np.uint64(0x94D049BB133111EB)
+    return x ^ (x >> np.uint64(31))
+
+
+class _UnionFind:
+    def __init__(self):
+        self.parent = {}
+
+    def find(self, x):
+        self.parent.setdefault(x, x)
+        while self.parent[x] != x:
+            self.parent[x] = self.parent[self.parent[x]]
+            x = self.parent[x]
+        return x
+
+    def union(self, a, b):
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+class NearDuplicateIndex:
+    """
+    MinHash signatures over word shingles with a banded LSH index.
+
+    Signatures use one-permutation hashing: each shingle is hashed once and
+    lands in one of `num_perm` bins, keeping the bin minimum; empty bins are
+    filled from the next non-empty one. Cost is linear in the text length,
+    not in text length x permutations. Two texts whose signatures agree on
+    at least `threshold` of the bins are treated as near-duplicates.
+    """
+
+    def __init__(self, num_perm=128, bands=16, threshold=0.8, shingle_size=5,
+                 max_entries=20000):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        self.max_entries = max_entries
+
+        self.signatures = OrderedDict()
+        self._buckets = [{} for _ in range(bands)]
+        self._token_hashes = {}
+        self._powers = _mix64(np.arange(1, shingle_size + 1, dtype=np.uint64))
+
+    # ------------------------------------------------------
+    # ✍️ Signatures
+    # ------------------------------------------------------
+    def _hash_tokens(self, tokens):
+        cache = self._token_hashes
+        if len(cache) > 500000:
+            cache.clear()
+        for token in set(tokens).difference(cache):
+            cache[token] = zlib.crc32(token.encode("utf-8"))
+        return np.fromiter(map(cache.__getitem__, tokens), dtype=np.uint64, count=len(tokens))
+
+    @staticmethod
+    def _tokenize(text):
+        return unicodedata.normalize("NFKC", text).lower().translate(_PUNCTUATION).split()
+
+    def signature(self, text):
+        """uint32[num_perm] MinHash signature; None for text without words."""
+        return self.signatures_for([text])[0]
+
+    def signatures_for(self, texts):
+        """
+        Signatures for many texts in one vectorized pass (one token-hash
+        lookup, one sort). Returns a list with None for texts without words.
+        """
+        token_lists = [self._tokenize(t) for t in texts]
+        lengths = np.array([len(t) for t in token_lists], dtype=np.int64)
+        out = [None] * len(texts)
+        if not lengths.sum():
+            return out
+
+        k = self.shingle_size
+        with np.errstate(over="ignore"):
+            hashes = self._hash_tokens([tok for tokens in token_lists for tok in tokens])
+            # Texts shorter than a shingle count as one shingle of all their tokens
+            owner = np.repeat(np.arange(len(texts)), lengths)
+            pad = np.zeros(k - 1, dtype=np.uint64)
+            padded = np.concatenate([hashes, pad])
+            owner_padded = np.concatenate([owner, np.full(k - 1, -1)])
+            # Order-sensitive combination of k consecutive token hashes
+            shingles = np.zeros(len(hashes), dtype=np.uint64)
+            for j in range(k):
+                same = owner_padded[j:j + len(hashes)] == owner
+                shingles = shingles + np.where(same, padded[j:j + len(hashes)], 0) * self._powers[j]
+            starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            position = np.arange(len(hashes)) - starts[owner]
+            keep = (position <= lengths[owner] - k) | (position == 0)
+            shingles, owner = shingles[keep], owner[keep]
+            mixed = _mix64(shingles)
+
+        # Minimum value per (text, bin): sort packed (text, bin, value) words
+        # and keep the first entry of each (text, bin)
+        bin_bits = max(1, (self.num_perm - 1).bit_length())
+        bins = mixed % np.uint64(self.num_perm)
+        values = np.minimum(mixed >> np.uint64(32), np.uint64(_EMPTY) - np.uint64(1))
+        packed = np.sort((owner.astype(np.uint64) << np.uint64(bin_bits + 32)) |
+                         (bins << np.uint64(32)) | values)
+        group = packed >> np.uint64(32)
+        first = np.ones(len(packed), dtype=bool)
+        first[1:] = group[1:] != group[:-1]
+        group, packed = group[first], packed[first]
+        sigs = np.full((len(texts), self.num_perm), _EMPTY, dtype=np.uint32)
+        sigs[(group >> np.uint64(bin_bits)).astype(np.intp),
+             (group & np.uint64((1 << bin_bits) - 1)).astype(np.intp)] = \
+            (packed & np.uint64(0xFFFFFFFF)).astype(np.uint32)
+
+        for i in np.flatnonzero(lengths):
+            out[i] = self._densify(sigs[i])
+        return out
+
+    def _densify(self, sig):
+        # An empty bin borrows from the next non-empty bin, salted by the
+        # distance so borrowed values stay comparable across texts
+        empty = np.flatnonzero(sig == _EMPTY)
+        if len(empty):
+            filled = np.flatnonzero(sig != _EMPTY)
+            nxt = filled[np.searchsorted(filled, empty) % len(filled)]
+            distance = ((nxt - empty) % self.num_perm).astype(np.uint32)
+            sig[empty] = sig[nxt] ^ (distance * np.uint32(0x9E3779B1))
+        return sig
+
+    # ------------------------------------------------------
+    # 🔎 Index
+    # ------------------------------------------------------
+    def _band_keys(self, sig):
+        return [sig[b * self.rows:(b + 1) * self.rows].tobytes() for b in range(self.bands)]
+
+    def similarity(self, a, b):
+        return float(np.mean(a == b))
+
+    def query(self, sig):
+        """[(key, estimated Jaccard)] for indexed texts at or above the threshold."""
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            candidates.update(bucket.get(band, ()))
+        matches = []
+        for key in candidates:
+            score = self.similarity(sig, self.signatures[key])
+            if score >= self.threshold:
+                matches.append((key, score))
+        return sorted(matches, key=lambda m: -m[1])
+
+    def add(self, key, text=None, sig=None):
+        """Index a text under `key`; returns its near-duplicates already indexed."""
+        sig = self.signature(text) if sig is None else sig
+        if sig is None:
+            return []
+        matches = self.query(sig)
+        if key in self.signatures:
+            self._remove(key)
+        self.signatures[key] = sig
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            bucket.setdefault(band, []).append(key)
+        while len(self.signatures) > self.max_entries:
+            self._remove(next(iter(self.signatures)))
+        return [m for m in matches if m[0] != key]
+
+    def _remove(self, key):
+        sig = self.signatures.pop(key)
+        for bucket, band in zip(self._buckets, self._band_keys(sig)):
+            members = bucket.get(band)
+            if members:
+                members.remove(key)
+                if not members:
+                    del bucket[band]
+
+    def cluster(self, texts):
+        """
+        Group {key: text} into near-duplicate clusters. Returns a list of
+        {"representative", "members", "previous"}: the representative is the
+        first member seen, and `previous` lists keys from earlier calls
+        (e.g. a loaded index) that the cluster matched.
+        """
+        uf = _UnionFind()
+        previous = {}
+        order = list(texts)
+        current = set(order)
+        signatures = self.signatures_for([texts[key] for key in order])
+        for key, sig in zip(order, signatures):
+            uf.find(key)
+            if sig is None:
+                continue
+            for other, _ in self.add(key, sig=sig):
+                if other in current:
+                    uf.union(other, key)
+                else:
+                    previous.setdefault(key, []).append(other)
+
+        groups = OrderedDict()
+        for key in order:
+            groups.setdefault(uf.find(key), []).append(key)
+        clusters = []
+        for members in groups.values():
+            earlier = sorted({p for m in members for p in previous.get(m, [])})
+            clusters.append({"representative": members[0], "members": members,
+                             "previous": earlier})
+        return clusters
+
+    # ------------------------------------------------------
+    # 💾 Persistence
+    # ------------------------------------------------------
+    def save(self, path=NEARDUP_INDEX_FILE):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        keys = list(self.signatures)
+        sigs = (np.stack(list(self.signatures.values())) if keys
+                else np.empty((0, self.num_perm), dtype=np.uint32))
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path, keys=np.array(keys, dtype=str), signatures=sigs,
+            params=np.array([self.num_perm, self.bands, self.shingle_size, self.max_entries]),
+            threshold=np.array([self.threshold]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=NEARDUP_INDEX_FILE, **kwargs):
+        """
+        Load a saved index, or return an empty one if there is none. The
+        saved signature parameters always win; `threshold` may be overridden.
+        """
+        if not os.path.exists(path):
+            return cls(**kwargs)
+        try:
+            data = np.load(path)
+            num_perm, bands, shingle_size, max_entries = (int(v) for v in data["params"])
+            threshold = kwargs.get("threshold", float(data["threshold"][0]))
+            keys, signatures = data["keys"], data["signatures"]
+        except (OSError, KeyError, ValueError, EOFError, zipfile.BadZipFile) as e:
+            print(f"⚠️ Failed to load near-duplicate index, starting fresh: {e}")
+            return cls(**kwargs)
+
+        index = cls(num_perm=num_perm, bands=bands, shingle_size=shingle_size,
+                    max_entries=max_entries, threshold=threshold)
+        for key, sig in zip(keys, signatures):
+            index.add(str(key), sig=sig)
+        return index
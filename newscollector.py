@@ -1,34 +1,69 @@
+import asyncio
 import requests
+import aiohttp
 from newspaper import Article
-from bs4 import BeautifulSoup
+import htmlparse
+from articleindex import content_hash, get_article_index
+from urls import COIN_URLS
 from urllib.parse import urlparse
 import langdetect
 import time
 
-# Optional dictionary mapping coin -> source URLs
-COIN_URLS = {
-    "BTC": [
-        "https://cointelegraph.com/tags/bitcoin",
-        "https://www.coindesk.com/price/bitcoin/news",
-        "https://crypto.news/tag/btc/",
-        "https://coinjournal.net/news/"
-    ],
-    "BNB": [
-        "https://cointelegraph.com/tags/binance-coin",
-        "https://www.coindesk.com/price/binance-coin/news",
-        "https://crypto.news/tag/bnb/",
-        "https://coinjournal.net/news/"
-    ]
-}
+HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Returned by the fetchers when the server answers 304 Not Modified
+NOT_MODIFIED = "__not_modified__"
+
+
+def client_session(concurrency=8, timeout=15):
+    """Pooled aiohttp session for the async fetchers; create it on the loop that will use it."""
+    return aiohttp.ClientSession(
+        headers=HEADERS,
+        timeout=aiohttp.ClientTimeout(total=timeout),
+        connector=aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300),
+    )
+
+
+class DomainRateLimiter:
+    """
+    Token-bucket limiter per domain: each domain refills `rate` tokens per
+    second up to `burst`, and every request spends one token.
+    """
+
+    def __init__(self, rate=1 / 1.5, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = {}
+        self._locks = {}
+
+    async def acquire(self, url):
+        domain = urlparse(url).netloc
+        lock = self._locks.setdefault(domain, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            tokens, last = self._buckets.get(domain, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            if tokens < 1:
+                await asyncio.sleep((1 - tokens) / self.rate)
+                now = time.monotonic()
+                tokens = 1
+            self._buckets[domain] = (tokens - 1, now)
 
 
 class NewsCollector:
     """
     Collects and extracts English-language news articles for a given coin.
     Returns a dictionary {url: article_text}.
+
+    With `skip_unchanged` (the default) pages are fetched conditionally
+    against the article index, and pages that answer 304 or whose text
+    hashes the same as what this `consumer` (by default the coin) last
+    processed are left out of the results. Returned texts only count as
+    processed once the caller has stored its results and calls commit().
     """
 
-    def __init__(self, urls=None, coin=None):
+    def __init__(self, urls=None, coin=None, skip_unchanged=True, article_index=None,
+                 consumer=None):
         if urls:
             self.urls = urls
         elif coin and coin.upper() in COIN_URLS:
@@ -36,49 +71,183 @@ class NewsCollector:
         else:
             raise ValueError("No valid URLs provided for NewsCollector.")
 
+        self.session = requests.Session()
+        self.session.headers.update(HEADERS)
+
+        # Extractors run in order on the same downloaded HTML; first text wins
+        self.extractors = [
+            ("newspaper3k", self._extract_newspaper),
+            ("paragraphs", self._extract_paragraphs),
+            ("meta_description", self._extract_meta_description),
+        ]
+        # {url: extraction report} for the latest collection
+        self.extraction_stats = {}
+
+        self.skip_unchanged = skip_unchanged
+        self.article_index = article_index or (get_article_index() if skip_unchanged else None)
+        self.consumer = consumer or (coin.upper() if coin else "default")
+        self.unchanged = set()
+        # {url: content hash} returned but not yet committed
+        self.pending = {}
+
     # ------------------------------------------------------
     # 📰 Extract text from a single article URL
     # ------------------------------------------------------
     def extract_article(self, url):
+        html, validators = self._download(url, conditional=True)
+        if html == NOT_MODIFIED:
+            return self._mark_unchanged(url)
+        if not html:
+            return None
+        text = self.extract_from_html(url, html)["text"]
+        return self._remember(url, html, text, validators)
+
+    def _download(self, url, conditional=False):
+        """(html, (etag, last_modified)); html is None on failure or NOT_MODIFIED."""
+        headers = self._conditional_headers(url) if conditional else {}
         try:
-            article = Article(url, language="en")
-            article.download()
-            article.parse()
-            text = article.text.strip()
-            if len(text) < 300:
-                raise ValueError(
-                    "Text too short for Newspaper3k, fallback triggered.")
-            print(f"✅ Extracted text with Newspaper3k ({len(text)} chars)")
-            return text
+            resp = self.session.get(url, timeout=10, headers=headers)
+            if resp.status_code == 304:
+                return NOT_MODIFIED, None
+            resp.raise_for_status()
+            return resp.text, self._validators(resp.headers)
         except Exception as e:
-            print(f"⚠️ Newspaper3k failed for {url}: {e}")
-            # fallback to simple HTML parsing
-            return self.fallback_parser(url)
+            print(f"⚠️ Download failed for {url}: {e}")
+            return None, None
+
+    # ------------------------------------------------------
+    # 🗂️ Cross-run article index
+    # ------------------------------------------------------
+    def _conditional_headers(self, url):
+        if not self.skip_unchanged:
+            return {}
+        return self.article_index.conditional_headers(url, self.consumer)
+
+    @staticmethod
+    def _validators(headers):
+        return headers.get("ETag"), headers.get("Last-Modified")
+
+    def _mark_unchanged(self, url):
+        print(f"♻️ Unchanged since last fetch: {url}")
+        self.article_index.touch(url)
+        self.unchanged.add(url)
+        return None
+
+    def _remember(self, url, html, text, validators):
+        """Index extracted text; returns it, or None if this consumer already processed it."""
+        if not text or self.article_index is None:
+            return text
+        etag, last_modified = validators or (None, None)
+        self.article_index.record(
+            url, text, etag, last_modified, htmlparse.canonical_link(html))
+        digest = content_hash(text)
+        if self.skip_unchanged and self.article_index.consumed_hash(self.consumer, url) == digest:
+            print(f"♻️ Same content as last processed: {url}")
+            self.unchanged.add(url)
+            return None
+        self.pending[url] = digest
+        return text
+
+    def commit(self, urls=None):
+        """
+        Mark returned texts (all, or just `urls`) as processed by this
+        consumer. Call after their results are stored; uncommitted texts are
+        offered again on the next collection.
+        """
+        if self.article_index is None:
+            return
+        urls = list(self.pending) if urls is None else [u for u in urls if u in self.pending]
+        self.article_index.mark_consumed(
+            self.consumer, [(url, self.pending.pop(url)) for url in urls])
+
+    # ------------------------------------------------------
+    # 🧩 Extraction pipeline over one downloaded page
+    # ------------------------------------------------------
+    def extract_from_html(self, url, html):
+        """
+        Feed the same HTML to each extractor until one returns text.
+        Returns {"url", "text", "extractor", "timings"} where timings maps
+        every extractor that ran to its duration in seconds.
+        """
+        report = {"url": url, "text": None, "extractor": None, "timings": {}}
+        for name, extractor in self.extractors:
+            start = time.perf_counter()
+            try:
+                text = extractor(url, html)
+            except Exception as e:
+                print(f"⚠️ {name} failed for {url}: {e}")
+                text = None
+            report["timings"][name] = time.perf_counter() - start
+            if text:
+                report["text"] = text
+                report["extractor"] = name
+                print(f"✅ Extracted text with {name} ({len(text)} chars)")
+                break
+
+        self.extraction_stats[url] = report
+        return report
+
+    def extractor_stats(self):
+        """Per-extractor wins, runs and average latency over the latest collection."""
+        stats = {name: {"wins": 0, "runs": 0, "total_seconds": 0.0}
+                 for name, _ in self.extractors}
+        for report in self.extraction_stats.values():
+            for name, seconds in report["timings"].items():
+                stats[name]["runs"] += 1
+                stats[name]["total_seconds"] += seconds
+            if report["extractor"]:
+                stats[report["extractor"]]["wins"] += 1
+        for entry in stats.values():
+            entry["avg_seconds"] = entry["total_seconds"] / \
+                entry["runs"] if entry["runs"] else 0.0
+        return stats
+
+    def _extract_newspaper(self, url, html):
+        article = Article(url, language="en")
+        article.download(input_html=html)
+        article.parse()
+        text = article.text.strip()
+        if len(text) < 300:
+            print(f"⚠️ Newspaper3k text too short for {url}, trying next extractor.")
+            return None
+        return text
+
+    def _extract_paragraphs(self, url, html):
+        # Try to extract meaningful text
+        text = htmlparse.paragraph_text(html)
+
+        # Language filter
+        if not self._is_english(url, text, min_chars=500):
+            return None
+
+        return text if text else None
+
+    def _extract_meta_description(self, url, html):
+        title, description = htmlparse.title_and_description(html)
+        parts = [part.strip() for part in (title, description) if part and part.strip()]
+        text = "\n".join(parts)
+        if len(text) < 30 or not self._is_english(url, text):
+            return None
+        return text
+
+    @staticmethod
+    def _is_english(url, text, min_chars=0):
+        """langdetect on the first 500 chars; texts of `min_chars` or fewer count as unknown."""
+        lang = langdetect.detect(text[:500]) if len(text) > min_chars else "unknown"
+        if lang != "en":
+            print(f"⚠️ Skipped non-English content ({lang}) from {url}")
+            return False
+        return True
 
     # ------------------------------------------------------
     # 🌐 Fallback HTML text extraction
     # ------------------------------------------------------
-    def fallback_parser(self, url):
+    def fallback_parser(self, url, html=None):
+        html = html if html is not None else self._download(url)[0]
+        if not html:
+            return None
         try:
-            headers = {"User-Agent": "Mozilla/5.0"}
-            resp = requests.get(url, headers=headers, timeout=10)
-            resp.raise_for_status()
-            soup = BeautifulSoup(resp.text, "html.parser")
-
-            # Try to extract meaningful text
-            paragraphs = soup.find_all("p")
-            text = "\n".join(p.get_text() for p in paragraphs)
-            text = text.strip()
-
-            # Language filter
-            lang = langdetect.detect(text[:500]) if len(
-                text) > 500 else "unknown"
-            if lang != "en":
-                print(f"⚠️ Skipped non-English content ({lang}) from {url}")
-                return None
-
-            print(f"✅ Extracted text with fallback parser ({len(text)} chars)")
-            return text if text else None
+            return self._extract_paragraphs(url, html)
         except Exception as e:
             print(f"⚠️ Fallback parser failed for {url}: {e}")
             return None
@@ -88,13 +257,104 @@ class NewsCollector:
     # ------------------------------------------------------
     def collect_news(self):
         results = {}
+        self.unchanged = set()
+        self.pending = {}
+        self.extraction_stats = {}
         for url in self.urls:
             print(f"🌐 Fetching: {url}")
             text = self.extract_article(url)
             if text:
                 results[url] = text
-            else:
+            elif url not in self.unchanged:
                 print(f"⚠️ No text extracted from {url}")
             # polite delay to avoid being blocked
             time.sleep(1.5)
         return results
+
+    # ------------------------------------------------------
+    # ⚡ Concurrent collection
+    # ------------------------------------------------------
+    async def _fetch_html_async(self, session, url, limiter, retries, backoff):
+        """(html, (etag, last_modified)); html is None on failure or NOT_MODIFIED."""
+        headers = self._conditional_headers(url)
+        for attempt in range(retries + 1):
+            await limiter.acquire(url)
+            try:
+                async with session.get(url, headers=headers) as resp:
+                    if resp.status == 304:
+                        return NOT_MODIFIED, None
+                    if resp.status == 429 or resp.status >= 500:
+                        error = f"HTTP {resp.status}"
+                    else:
+                        resp.raise_for_status()
+                        html = await resp.text(errors="replace")
+                        return html, self._validators(resp.headers)
+            except aiohttp.ClientResponseError as e:
+                print(f"⚠️ Fetch failed for {url}: HTTP {e.status}")
+                return None, None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = repr(e)
+
+            if attempt < retries:
+                await asyncio.sleep(backoff * 2 ** attempt)
+        print(f"⚠️ Fetch failed for {url} after {retries + 1} attempts: {error}")
+        return None, None
+
+    async def _collect_one_async(self, session, url, limiter, semaphore, retries, backoff):
+        async with semaphore:
+            print(f"🌐 Fetching: {url}")
+            html, validators = await self._fetch_html_async(
+                session, url, limiter, retries, backoff)
+        if html == NOT_MODIFIED:
+            return self._mark_unchanged(url)
+        if not html:
+            return None
+        # Parsing is CPU-bound; keep it off the event loop
+        report = await asyncio.to_thread(self.extract_from_html, url, html)
+        return await asyncio.to_thread(self._remember, url, html, report["text"], validators)
+
+    async def stream_news_async(self, concurrency=8, rate=1 / 1.5, timeout=15,
+                                retries=3, backoff=1.0, session=None):
+        """
+        Async generator of (url, article_text) in completion order, so
+        consumers can start on the first article while the rest download.
+        Takes the same options as collect_news_async().
+        """
+        self.unchanged = set()
+        self.pending = {}
+        self.extraction_stats = {}
+        limiter = DomainRateLimiter(rate)
+        semaphore = asyncio.Semaphore(concurrency)
+        own_session = session is None
+        if own_session:
+            session = client_session(concurrency, timeout)
+
+        async def fetch(url):
+            return url, await self._collect_one_async(
+                session, url, limiter, semaphore, retries, backoff)
+
+        tasks = [asyncio.ensure_future(fetch(url)) for url in self.urls]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                url, text = await next_done
+                if text:
+                    yield url, text
+                elif url not in self.unchanged:
+                    print(f"⚠️ No text extracted from {url}")
+        finally:
+            # Consumer stopped early: don't leave downloads running
+            for task in tasks:
+                task.cancel()
+            if own_session:
+                await session.close()
+
+    async def collect_news_async(self, concurrency=8, rate=1 / 1.5, timeout=15,
+                                 retries=3, backoff=1.0, session=None):
+        """
+        Fetch every URL concurrently over one pooled aiohttp session.
+        Politeness is enforced per domain (`rate` requests/second) instead of
+        a global sleep. Returns {url: article_text} like collect_news().
+        """
+        texts = {url: text async for url, text in self.stream_news_async(
+            concurrency, rate, timeout, retries, backoff, session)}
+        return {url: texts[url] for url in self.urls if url in texts}
@@ -0,0 +1,186 @@
+# newscorpus.py
+import asyncio
+import re
+from collections import Counter
+
+from articleindex import content_hash
+from feedingest import FeedIngestor
+from neardup import NearDuplicateIndex
+from newscollector import NewsCollector
+from urls import COIN_ALIASES, COIN_FEEDS, COIN_URLS
+
+
+class CoinMatcher:
+    """
+    Finds which coins a text mentions. Names match case-insensitively and
+    tickers only as written (so "ada" or "sol" in prose don't count), both
+    on word boundaries, with one compiled pattern each.
+    """
+
+    def __init__(self, aliases=COIN_ALIASES, coins=None):
+        coins = set(c.upper() for c in coins) if coins else set(aliases)
+        self.by_name, self.by_ticker = {}, {}
+        for coin, entry in aliases.items():
+            if coin not in coins:
+                continue
+            for name in entry.get("names", []):
+                self.by_name[name.lower()] = coin
+            for ticker in entry.get("tickers", []):
+                self.by_ticker[ticker] = coin
+        # Coins without an alias entry still match on their bare ticker
+        for coin in coins:
+            self.by_ticker.setdefault(coin, coin)
+
+        self._names = self._compile(self.by_name, re.IGNORECASE)
+        self._tickers = self._compile(self.by_ticker, 0)
+
+    @staticmethod
+    def _compile(words, flags):
+        if not words:
+            return None
+        # Longest first so "bnb chain" wins over a shorter overlapping alias
+        alternation = "|".join(re.escape(w) for w in sorted(words, key=len, reverse=True))
+        return re.compile(rf"(?<![\w$])\$?({alternation})(?!\w)", flags)
+
+    def mentions(self, text):
+        """Counter of coin → number of mentions."""
+        counts = Counter()
+        if self._names:
+            counts.update(self.by_name[m.lower()] for m in self._names.findall(text))
+        if self._tickers:
+            counts.update(self.by_ticker[m] for m in self._tickers.findall(text))
+        return counts
+
+    def route(self, text, min_mentions=1):
+        return sorted(c for c, n in self.mentions(text).items() if n >= min_mentions)
+
+
+class NewsCorpus:
+    """
+    One news pass for many coins: every unique source URL is fetched once,
+    identical and near-identical texts are kept once, and each article is
+    routed to every coin it mentions. Articles are scored once and the
+    result fanned out, so a syndicated story counts as one article.
+
+    Pass a long-lived `neardup_index` to also drop stories already seen in
+    earlier passes. With `feeds`, sources are read from their RSS/Atom feeds
+    and sitemaps and only articles newer than each feed's cursor are fetched.
+    With `skip_unchanged`, pages stay "new" until commit() is called after
+    their results are stored.
+    """
+
+    def __init__(self, coins, urls=None, min_mentions=1, skip_unchanged=False, debug=False,
+                 neardup_index=None, feeds=False):
+        self.coins = [c.upper() for c in coins]
+        self.feeds = feeds
+        sources = COIN_FEEDS if feeds else COIN_URLS
+        # Unique sources across all coins, in first-seen order
+        self.urls = list(dict.fromkeys(
+            urls or [u for c in self.coins for u in sources.get(c, [])]))
+        self.matcher = CoinMatcher(coins=self.coins)
+        self.min_mentions = min_mentions
+        self.skip_unchanged = skip_unchanged
+        self.debug = debug
+        self.neardup_index = neardup_index
+        # Processed-page state in the article index is kept per coin set
+        self.consumer = "corpus:" + ",".join(sorted(self.coins))
+        self.collector = None
+        self.collected = []
+        self.articles = []
+
+    def collect(self, **kwargs):
+        """Fetch, deduplicate and route. Returns the article list."""
+        return asyncio.run(self.collect_async(**kwargs))
+
+    async def collect_async(self, **kwargs):
+        """collect() on the running loop; pass `session=` to reuse a long-lived session."""
+        if not self.urls:
+            self.articles = []
+            return self.articles
+        if self.collector is None:
+            if self.feeds:
+                self.collector = FeedIngestor(
+                    feeds=self.urls, debug=self.debug, consumer=self.consumer)
+            else:
+                self.collector = NewsCollector(
+                    urls=self.urls, skip_unchanged=self.skip_unchanged, consumer=self.consumer)
+        texts = await self.collector.collect_news_async(**kwargs)
+        self.collected = list(texts)
+        return self.add_texts(texts)
+
+    def commit(self, failed=()):
+        """
+        Mark the last collection as processed (call once its results are
+        stored). Pages of stories routed to a coin in `failed` stay new, so
+        they are offered again next time.
+        """
+        if self.collector is None:
+            return
+        failed = {c.upper() for c in failed}
+        held = {url for a in self.articles if failed & set(a["coins"])
+                for url in a["urls"] + a["duplicates"]}
+        self.collector.commit([url for url in self.collected if url not in held])
+
+    def add_texts(self, texts):
+        """
+        Build articles from {url: text}. Same-content pages are kept once;
+        near-duplicates are folded into the first copy (`duplicates` lists
+        the other URLs, `coins` is the union of their coins).
+        """
+        seen = {}
+        for url, text in texts.items():
+            digest = content_hash(text)
+            if digest in seen:
+                seen[digest]["urls"].append(url)
+                continue
+            seen[digest] = {
+                "url": url,
+                "urls": [url],
+                "text": text,
+                "hash": digest,
+                "coins": self.matcher.route(text, self.min_mentions),
+                "duplicates": [],
+            }
+        by_url = {a["url"]: a for a in seen.values()}
+
+        index = self.neardup_index or NearDuplicateIndex()
+        self.articles, repeats = [], 0
+        for cluster in index.cluster({url: a["text"] for url, a in by_url.items()}):
+            if cluster["previous"]:
+                # Story already handled in an earlier pass
+                repeats += 1
+                continue
+            article = by_url[cluster["representative"]]
+            coins = set(article["coins"])
+            for member in cluster["members"][1:]:
+                coins.update(by_url[member]["coins"])
+                article["duplicates"].extend(by_url[member]["urls"])
+            article["coins"] = sorted(coins)
+            self.articles.append(article)
+
+        if self.debug:
+            routed = sum(len(a["coins"]) for a in self.articles)
+            print(f"📚 {len(texts)} pages → {len(seen)} unique texts → "
+                  f"{len(self.articles)} stories ({repeats} seen before), "
+                  f"{routed} coin assignments over {len(self.coins)} coins")
+        return self.articles
+
+    def for_coin(self, coin):
+        """{url: text} of the articles routed to `coin`."""
+        coin = coin.upper()
+        return {a["url"]: a["text"] for a in self.articles if coin in a["coins"]}
+
+    def score(self, decision_agent):
+        """
+        Classify every routed story once. Returns
+        {coin: [(url, label, confidence), ...]} with one entry per story,
+        however many sites carried it.
+        """
+        routed = [a for a in self.articles if a["coins"]]
+        labels = decision_agent.classify_many([a["text"] for a in routed]) if routed else []
+        by_coin = {coin: [] for coin in self.coins}
+        for article, (label, confidence) in zip(routed, labels):
+            article["sentiment"] = (label, confidence)
+            for coin in article["coins"]:
+                by_coin[coin].append((article["url"], label, confidence))
+        return by_coin
@@ -0,0 +1,194 @@
+# paramsweep.py
+import argparse
+import itertools
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from backtester import (DEFAULT_PARAMS, Backtester, FeatureCache, decide,
+                        sentiment_codes, simulate, summarize, technical_bias)
+
+DEFAULT_GRID = {
+    "ma_fast": [10, 20, 30],
+    "ma_slow": [50, 100, 200],
+    "rsi_period": [14],
+    "rsi_upper": [70, 80],
+    "rsi_lower": [20, 30],
+    "macd_fast": [12],
+    "macd_slow": [26],
+    "macd_signal": [9],
+    "risk_pct": [0.02, 0.03, 0.05],
+    "reward_pct": [0.03, 0.05, 0.08],
+    "use_rsi_filter": [False, True],
+    "use_macd_filter": [False, True],
+}
+
+# Sorting by these keeps configs that share indicator arrays in the same chunk
+INDICATOR_KEYS = ["ma_fast", "ma_slow", "rsi_period",
+                  "macd_fast", "macd_slow", "macd_signal"]
+
+
+def _is_valid(params):
+    return params["ma_fast"] < params["ma_slow"] and params["macd_fast"] < params["macd_slow"]
+
+
+def expand_grid(grid):
+    """Every combination of the grid values, skipping impossible ones."""
+    keys = list(grid)
+    configs = [dict(zip(keys, values)) for values in itertools.product(*grid.values())]
+    return [{**DEFAULT_PARAMS, **c} for c in configs if _is_valid({**DEFAULT_PARAMS, **c})]
+
+
+def sample_grid(grid, samples, seed=0):
+    """Random sample of `samples` distinct configurations from the grid."""
+    configs = expand_grid(grid)
+    random.Random(seed).shuffle(configs)
+    return configs[:samples]
+
+
+# ------------------------------------------------------
+# 🧵 Worker side: read-only views over one shared block
+# ------------------------------------------------------
+_worker = {}
+
+
+def _init_worker(shm_name, shape, layout, mode, max_hold, fee):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    block = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    block.flags.writeable = False
+
+    coins = {}
+    for coin, start, length in layout:
+        high, low, close, sentiment = block[:, start:start + length]
+        coins[coin] = {
+            "high": high, "low": low, "close": close,
+            "sentiment": sentiment.astype(int),
+            # Rolling statistics are memoized per coin and reused by every
+            # configuration this worker evaluates
+            "features": FeatureCache(close),
+        }
+    _worker.update(shm=shm, coins=coins, mode=mode, max_hold=max_hold, fee=fee)
+
+
+def _evaluate(params):
+    per_coin = []
+    for data in _worker["coins"].values():
+        features = data["features"]
+        sentiment = data["sentiment"] if _worker["mode"] == "stored" else None
+        action = decide(technical_bias(features, params), sentiment, features, params)
+        trades = simulate(data["high"], data["low"], data["close"], action,
+                          params["risk_pct"], params["reward_pct"],
+                          _worker["max_hold"], _worker["fee"],
+                          features.exit_index(data["high"], data["low"], _worker["max_hold"]))
+        per_coin.append(summarize(trades))
+
+    returns = [m["total_return"] for m in per_coin]
+    trades = sum(m["trades"] for m in per_coin)
+    wins = sum(m["win_rate"] * m["trades"] for m in per_coin)
+    return {
+        **params,
+        "mean_return": float(np.mean(returns)) if returns else 0.0,
+        "worst_return": float(np.min(returns)) if returns else 0.0,
+        "worst_drawdown": float(min((m["max_drawdown"] for m in per_coin), default=0.0)),
+        "trades": trades,
+        "win_rate": wins / trades if trades else 0.0,
+    }
+
+
+class ParameterSweep:
+    """
+    Evaluates many rule/risk configurations over the same price history on a
+    process pool. Price and sentiment arrays live in one shared-memory block
+    that workers map read-only instead of receiving copies.
+    """
+
+    def __init__(self, coins, timeframe="1h", period="730d", mode="technical",
+                 workers=None, max_hold=240, fee=0.001, debug=False):
+        self.coins = coins
+        self.backtester = Backtester(timeframe=timeframe, period=period, mode=mode,
+                                     max_hold=max_hold, fee=fee, debug=debug)
+        self.workers = workers or os.cpu_count() or 1
+        self.debug = debug
+
+    def _pack(self):
+        """Lay every coin's high/low/close/sentiment rows side by side."""
+        frames = self.backtester.load_prices(self.coins)
+        layout, columns, start = [], [], 0
+        for coin in self.coins:
+            frame = frames.get(coin)
+            if frame is None or frame.empty:
+                print(f"⚠️ No history for {coin}, skipping")
+                continue
+            if self.backtester.mode == "stored":
+                news_ts, news_codes = self.backtester.load_sentiment(coin)
+                sentiment = sentiment_codes(frame.index.asi8 // 10**9, news_ts,
+                                            news_codes, self.backtester.sentiment_ttl)
+            else:
+                sentiment = np.zeros(len(frame))
+            columns.append(np.vstack([frame["High"].to_numpy(dtype=float),
+                                      frame["Low"].to_numpy(dtype=float),
+                                      frame["Close"].to_numpy(dtype=float),
+                                      sentiment.astype(float)]))
+            layout.append((coin, start, len(frame)))
+            start += len(frame)
+        return (np.hstack(columns) if columns else np.empty((4, 0))), layout
+
+    def run(self, configs, rank_by="mean_return"):
+        """Returns a DataFrame of configs and metrics, best first."""
+        data, layout = self._pack()
+        if not layout:
+            print("⚠️ No price history to sweep over.")
+            return pd.DataFrame()
+
+        configs = sorted(configs, key=lambda c: tuple(c[k] for k in INDICATOR_KEYS))
+        shm = shared_memory.SharedMemory(create=True, size=max(data.nbytes, 1))
+        try:
+            np.ndarray(data.shape, dtype=np.float64, buffer=shm.buf)[:] = data
+            print(f"🧪 Sweeping {len(configs)} configurations over {len(layout)} coins "
+                  f"({data.shape[1]} bars) on {self.workers} workers...")
+            chunksize = max(1, len(configs) // (self.workers * 4))
+            with ProcessPoolExecutor(
+                max_workers=self.workers,
+                initializer=_init_worker,
+                initargs=(shm.name, data.shape, layout, self.backtester.mode,
+                          self.backtester.max_hold, self.backtester.fee),
+            ) as pool:
+                results = list(pool.map(_evaluate, configs, chunksize=chunksize))
+        finally:
+            shm.close()
+            shm.unlink()
+
+        return pd.DataFrame(results).sort_values(
+            rank_by, ascending=False).reset_index(drop=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Parameter sweep over indicator windows and risk levels")
+    parser.add_argument("--coins", nargs="+", default=["BTC", "ETH", "BNB", "SOL", "ADA"])
+    parser.add_argument("--timeframe", default="1h")
+    parser.add_argument("--period", default="730d")
+    parser.add_argument("--mode", choices=["stored", "technical"], default="technical")
+    parser.add_argument("--samples", type=int,
+                        help="Evaluate a random sample of the grid instead of all of it")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, help="Worker processes (default: all cores)")
+    parser.add_argument("--rank-by", default="mean_return",
+                        choices=["mean_return", "worst_return", "worst_drawdown", "win_rate"])
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args()
+
+    configs = sample_grid(DEFAULT_GRID, args.samples, args.seed) if args.samples \
+        else expand_grid(DEFAULT_GRID)
+    sweep = ParameterSweep(args.coins, timeframe=args.timeframe, period=args.period,
+                           mode=args.mode, workers=args.workers)
+    results = sweep.run(configs, rank_by=args.rank_by)
+    if not results.empty:
+        print(results.head(args.top).to_string(index=False))
+        os.makedirs("reports", exist_ok=True)
+        results.to_csv("reports/sweep_results.csv", index=False)
+        print("📄 Results saved to reports/sweep_results.csv")
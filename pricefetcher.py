@@ -1,17 +1,92 @@
 # pricefetcher.py
+import os
+import threading
+import time
 
 import requests
 
+BINANCE_TICKER_URL = "https://api.binance.com/api/v3/ticker/price"
+
+
+class PriceService:
+    """
+    Snapshot of every Binance spot price from one call to the no-symbol
+    ticker/price endpoint, reused until it is `ttl` seconds old. A failed
+    refresh keeps serving the previous snapshot (up to `max_stale` seconds
+    old) and is not retried for `retry_after` seconds, so an outage does not
+    turn into a request per lookup.
+    """
+
+    def __init__(self, ttl=30.0, quote="USDT", retry_after=30.0, max_stale=300.0,
+                 timeout=5, session=None):
+        self.ttl = ttl
+        self.quote = quote.upper()
+        self.retry_after = retry_after
+        self.max_stale = max_stale
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.prices = {}
+        self.fetched_at = 0.0
+        self.requests = 0
+        self._failed_at = 0.0
+        self._lock = threading.Lock()
+
+    def _is_fresh(self):
+        now = time.time()
+        return (now - self.fetched_at < self.ttl or
+                now - self._failed_at < self.retry_after)
+
+    def refresh(self, force=False):
+        """Fetch a new snapshot unless the current one is still fresh."""
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if not force and self._is_fresh():
+                return self.prices
+            self.requests += 1
+            try:
+                response = self.session.get(BINANCE_TICKER_URL, timeout=self.timeout)
+                if response.status_code != 200:
+                    raise RuntimeError(f"HTTP {response.status_code}")
+                self.prices = {row["symbol"]: float(row["price"]) for row in response.json()}
+                self.fetched_at = time.time()
+            except Exception as e:
+                self._failed_at = time.time()
+                print(f"⚠️ Binance price snapshot failed: {e}")
+        return self.prices
+
+    def snapshot(self):
+        """{symbol: price} for every pair, refreshed if older than the TTL."""
+        if not self._is_fresh():
+            self.refresh()
+        if time.time() - self.fetched_at > self.max_stale:
+            return {}
+        return self.prices
+
+    def get(self, symbol):
+        """Price of `symbol` against the quote asset (e.g. BTC → BTCUSDT), or None."""
+        return self.snapshot().get(f"{symbol.upper()}{self.quote}")
+
+    def get_many(self, symbols):
+        prices = self.snapshot()
+        return {s: prices.get(f"{s.upper()}{self.quote}") for s in symbols}
+
+
+_default_service = None
+_default_pid = None
+
+
+def get_price_service() -> PriceService:
+    """Process-wide shared PriceService (re-created after a fork)."""
+    global _default_service, _default_pid
+    if _default_service is None or _default_pid != os.getpid():
+        _default_service = PriceService(
+            ttl=float(os.environ.get("SARVA_PRICE_TTL", 30)))
+        _default_pid = os.getpid()
+    return _default_service
+
 
 def get_price(symbol="BNB"):
-    try:
-        pair = f"{symbol.upper()}USDT"
-        url = f"https://api.binance.com/api/v3/ticker/price?symbol={pair}"
-        response = requests.get(url, timeout=5)
-        if response.status_code != 200:
-            print(f"⚠️ Binance API error for {pair}")
-            return None
-        return float(response.json()["price"])
-    except Exception as e:
-        print(f"⚠️ Failed to fetch {symbol} price: {e}")
-        return None
+    price = get_price_service().get(symbol)
+    if price is None:
+        print(f"⚠️ No Binance price for {symbol.upper()}USDT")
+    return price
@@ -1,15 +1,20 @@
-import asyncio
-import base64
 import urllib.parse
-from playwright.async_api import async_playwright
-from bs4 import BeautifulSoup
-import re
+
+import htmlparse
+from articleindex import get_article_index
+from browserpool import get_browser_pool
 
 
 class SearchAgent:
-    def __init__(self, coin_name: str, debug: bool = False):
+    def __init__(self, coin_name: str, debug: bool = False, browser_pool=None,
+                 skip_seen: bool = True, article_index=None, consumer=None):
         self.coin_name = coin_name
         self.debug = debug
+        self.browser_pool = browser_pool
+        # Drop results this consumer (the coin's collector by default) already processed
+        self.skip_seen = skip_seen
+        self.article_index = article_index
+        self.consumer = consumer or coin_name.upper()
 
         # Whitelist of good English crypto/finance news sources
         self.allowed_domains = [
@@ -28,35 +33,32 @@ class SearchAgent:
             "youtube.com", "facebook.com", "twitter.com", "x.com"
         ]
 
+    @property
+    def pool(self):
+        if self.browser_pool is None:
+            self.browser_pool = get_browser_pool()
+        return self.browser_pool
+
+    def _query(self):
+        return f"{self.coin_name} cryptocurrency news site"
+
+    def _search_url(self, query: str):
+        search_url = (
+            f"https://www.bing.com/search?q={urllib.parse.quote(query)}"
+            f"&setlang=en&cc=US&lr=en&FORM=HDRSC1"
+        )
+        if self.debug:
+            print(
+                f"🔎 Searching Bing for {self.coin_name} news (Playwright)...")
+            print(f"URL: {search_url}")
+        return search_url
+
     async def _bing_search_playwright(self, query: str):
-        async with async_playwright() as p:
-            browser = await p.firefox.launch(headless=True)
-            page = await browser.new_page()
-
-            search_url = (
-                f"https://www.bing.com/search?q={urllib.parse.quote(query)}"
-                f"&setlang=en&cc=US&lr=en&FORM=HDRSC1"
-            )
-            if self.debug:
-                print(
-                    f"🔎 Searching Bing for {self.coin_name} news (Playwright)...")
-                print(f"URL: {search_url}")
-
-            await page.goto(search_url, timeout=60000)
-            content = await page.content()
-            await browser.close()
-            return content
+        # Runs on the shared browser's own loop; awaitable from any loop
+        return await self.pool.fetch_in_loop(self._search_url(query))
 
     def _decode_bing_url(self, raw_url: str):
-        match = re.search(r"u=a1([^&]+)", raw_url)
-        if not match:
-            return None
-        encoded_part = match.group(1)
-        try:
-            decoded = base64.b64decode(encoded_part).decode("utf-8")
-            return decoded
-        except Exception:
-            return None
+        return htmlparse.decode_bing_url(raw_url)
 
     def _is_valid_news_url(self, url: str):
         if not url or not url.startswith("http"):
@@ -68,11 +70,11 @@ class SearchAgent:
         return True
 
     async def search_news_async(self):
-        query = f"{self.coin_name} cryptocurrency news site"
-        html = await self._bing_search_playwright(query)
+        html = await self._bing_search_playwright(self._query())
+        return self.parse_results(html)
 
-        soup = BeautifulSoup(html, "html.parser")
-        hrefs = [a.get("href") for a in soup.find_all("a", href=True)]
+    def parse_results(self, html: str):
+        hrefs = htmlparse.links(html)
 
         if self.debug:
             print("🔍 DEBUG: Extracted hrefs from Bing page:")
@@ -95,6 +97,13 @@ class SearchAgent:
         # Keep only real English news domains
         final_urls = [u for u in decoded_urls if self._is_valid_news_url(u)]
 
+        if self.skip_seen and final_urls:
+            index = self.article_index or get_article_index()
+            new_urls = index.filter_new(final_urls, consumer=self.consumer)
+            if self.debug and len(new_urls) < len(final_urls):
+                print(f"♻️ Skipping {len(final_urls) - len(new_urls)} already processed URLs")
+            final_urls = new_urls
+
         if final_urls:
             print(f"✅ Found {len(final_urls)} valid English news URLs")
             for i, url in enumerate(final_urls):
@@ -105,4 +114,26 @@ class SearchAgent:
         return list(dict.fromkeys(final_urls))  # deduplicate
 
     def search_news(self):
-        return asyncio.run(self.search_news_async())
+        return self.parse_results(self.pool.fetch(self._search_url(self._query())))
+
+    @classmethod
+    def search_many(cls, coins, debug: bool = False, browser_pool=None, skip_seen: bool = True):
+        """
+        Search several coins at once over the shared browser (bounded by its
+        page limit). Returns {coin: [urls]}; a failed search yields [].
+        """
+        agents = [cls(coin, debug=debug, browser_pool=browser_pool, skip_seen=skip_seen)
+                  for coin in coins]
+        if not agents:
+            return {}
+        pool = agents[0].pool
+        pages = pool.fetch_many([a._search_url(a._query()) for a in agents])
+
+        results = {}
+        for agent, html in zip(agents, pages):
+            if isinstance(html, Exception):
+                print(f"⚠️ Search failed for {agent.coin_name}: {html}")
+                results[agent.coin_name] = []
+            else:
+                results[agent.coin_name] = agent.parse_results(html)
+        return results
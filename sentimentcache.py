@@ -0,0 +1,157 @@
+# sentimentcache.py
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+
+SENTIMENT_CACHE_FILE = "data/sentiment_cache.db"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivial reflows still hit."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def cache_key(text: str, model_id: str) -> str:
+    payload = f"{model_id}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+class SentimentCache:
+    """
+    SQLite-backed cache of sentiment results keyed by a hash of the normalized
+    text plus the model identity. Entries older than `max_age_days` are
+    ignored and evicted; beyond `max_entries` the least recently used go first.
+    """
+
+    def __init__(self, db_path=SENTIMENT_CACHE_FILE, max_entries: int = 50000, max_age_days: float = 30):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        if os.path.dirname(db_path):
+            os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.conn = sqlite3.connect(
+            self.db_path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.create_tables()
+
+    def create_tables(self):
+        c = self.conn.cursor()
+        c.execute("""
+        CREATE TABLE IF NOT EXISTS sentiment_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            label TEXT,
+            probs TEXT,
+            confidence REAL,
+            created_at REAL,
+            last_used REAL
+        )
+        """)
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sentiment_cache_last_used ON sentiment_cache(last_used)")
+        c.execute(
+            "CREATE INDEX IF NOT EXISTS idx_sentiment_cache_created ON sentiment_cache(created_at)")
+        self.conn.commit()
+
+    def get_many(self, texts, model_id: str):
+        """
+        Returns one entry per text: (label, confidence, probs) on a hit,
+        None on a miss.
+        """
+        keys = [cache_key(text, model_id) for text in texts]
+        found = {}
+        now = time.time()
+        with self._lock:
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, label, confidence, probs FROM sentiment_cache "
+                    f"WHERE key IN ({placeholders}) AND created_at >= ?",
+                    (*chunk, now - self.max_age),
+                ).fetchall()
+                for key, label, confidence, probs in rows:
+                    found[key] = (label, confidence, json.loads(probs))
+
+            if found:
+                self.conn.executemany(
+                    "UPDATE sentiment_cache SET last_used = ? WHERE key = ?",
+                    [(now, key) for key in found])
+                self.conn.commit()
+
+        results = [found.get(key) for key in keys]
+        hits = sum(r is not None for r in results)
+        self.hits += hits
+        self.misses += len(results) - hits
+        return results
+
+    def put_many(self, texts, model_id: str, results):
+        """Store [(label, confidence, probs)] for the given texts."""
+        now = time.time()
+        rows = [
+            (cache_key(text, model_id), model_id, label,
+             json.dumps(probs), confidence, now, now)
+            for text, (label, confidence, probs) in zip(texts, results)
+        ]
+        with self._lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sentiment_cache VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.commit()
+        self.evict()
+
+    def evict(self):
+        """Drop expired entries, then the least recently used above max_entries."""
+        with self._lock:
+            self.conn.execute(
+                "DELETE FROM sentiment_cache WHERE created_at < ?",
+                (time.time() - self.max_age,))
+            count = self.conn.execute(
+                "SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute("""
+                    DELETE FROM sentiment_cache WHERE key IN (
+                        SELECT key FROM sentiment_cache ORDER BY last_used LIMIT ?
+                    )""", (count - self.max_entries,))
+            self.conn.commit()
+
+    def stats(self):
+        entries = self.conn.execute(
+            "SELECT COUNT(*) FROM sentiment_cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self.conn.execute("DELETE FROM sentiment_cache")
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+_default_cache = None
+_default_pid = None
+
+
+def get_sentiment_cache() -> SentimentCache:
+    """Process-wide shared SentimentCache (re-created after a fork)."""
+    global _default_cache, _default_pid
+    if _default_cache is None or _default_pid != os.getpid():
+        _default_cache = SentimentCache()
+        _default_pid = os.getpid()
+    return _default_cache
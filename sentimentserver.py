@@ -0,0 +1,288 @@
+# sentimentserver.py
+"""
+Local sentiment inference server: one resident FinBERT shared by every
+agent on the host.
+
+Clients send newline-delimited JSON over a Unix socket (or localhost TCP).
+Texts from concurrent requests are merged into micro-batches: a batch runs
+as soon as it holds `max_batch` texts or `max_wait` seconds after its first
+text arrived, whichever comes first.
+
+    python sentimentserver.py                     # serve on data/sentiment.sock
+    python sentimentserver.py --address 127.0.0.1:8765 --backend int8
+    python sentimentserver.py --stats             # ask a running server
+
+Point agents at it with SARVA_SENTIMENT_SERVER=<address> (or
+mainagent.py --sentiment-server); see DecisionAgent(server=...).
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import time
+from collections import deque
+
+SENTIMENT_SOCKET = "data/sentiment.sock"
+MAX_LINE = 64 * 1024 * 1024
+
+
+def parse_address(address):
+    """("unix", path) or ("tcp", (host, port)) for "host:port", "unix:path" or a path."""
+    address = address or SENTIMENT_SOCKET
+    if address.startswith("unix:"):
+        return "unix", address[len("unix:"):]
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return "tcp", (host or "127.0.0.1", int(port))
+    return "unix", address
+
+
+class SentimentServer:
+    """
+    Serves DecisionAgent._predict_local() to many clients. Requests:
+
+        {"texts": [...], "model_id": "..."}  → {"results": [[label, confidence, probs], ...]}
+        {"op": "stats"}                      → {"stats": {...}}
+        {"op": "ping"}                       → {"model_id": "..."}
+
+    A request whose model_id differs from the server's gets {"error": ...},
+    so clients never mix cache entries between backends.
+    """
+
+    def __init__(self, address=None, backend=None, max_batch=64, max_wait=0.01):
+        from decisionagent import DecisionAgent
+
+        self.address = address or SENTIMENT_SOCKET
+        # Always infers locally, even if SARVA_SENTIMENT_SERVER points here
+        self.agent = DecisionAgent(backend=backend)
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+
+        self._queue = None
+        self._pending_texts = 0
+        self._latencies = deque(maxlen=1000)
+        self._batch_sizes = deque(maxlen=1000)
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.errors = 0
+        self.started = time.time()
+        self.load_seconds = None
+
+    # ------------------------------------------------------
+    # 🧮 Batching
+    # ------------------------------------------------------
+    async def _next_batch(self):
+        """Wait for a first request, then gather more until full or the deadline."""
+        batch = [await self._queue.get()]
+        size = len(batch[0][0])
+        deadline = time.monotonic() + self.max_wait
+        while size < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            batch.append(item)
+            size += len(item[0])
+        return batch
+
+    async def _batch_loop(self):
+        while True:
+            batch = await self._next_batch()
+            # Identical texts from different clients run once
+            unique = list(dict.fromkeys(t for texts, _ in batch for t in texts))
+            try:
+                predictions = await asyncio.to_thread(self.agent._predict_local, unique)
+                by_text = dict(zip(unique, predictions))
+                for texts, future in batch:
+                    if not future.done():
+                        future.set_result([list(by_text[t]) for t in texts])
+            except Exception as e:
+                self.errors += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            finally:
+                self._pending_texts -= sum(len(texts) for texts, _ in batch)
+            self.batches += 1
+            self._batch_sizes.append(len(unique))
+
+    async def predict(self, texts):
+        future = asyncio.get_running_loop().create_future()
+        self._pending_texts += len(texts)
+        await self._queue.put((texts, future))
+        return await future
+
+    # ------------------------------------------------------
+    # 🔌 Protocol
+    # ------------------------------------------------------
+    async def _respond(self, request):
+        op = request.get("op", "predict")
+        if op == "ping":
+            return {"model_id": self.agent.model_id}
+        if op == "stats":
+            return {"stats": self.stats()}
+        if op != "predict":
+            return {"error": f"unknown op: {op}"}
+
+        model_id = request.get("model_id")
+        if model_id and model_id != self.agent.model_id:
+            return {"error": f"server runs {self.agent.model_id}, not {model_id}"}
+        texts = request.get("texts") or []
+        if not texts:
+            return {"results": []}
+
+        start = time.perf_counter()
+        results = await self.predict([str(t) for t in texts])
+        self._latencies.append(time.perf_counter() - start)
+        self.requests += 1
+        self.texts += len(texts)
+        return {"results": results}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    response = await self._respond(json.loads(line))
+                except Exception as e:
+                    response = {"error": repr(e)}
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def stats(self):
+        latencies = sorted(self._latencies)
+
+        def percentile(p):
+            return round(latencies[int(p * (len(latencies) - 1))] * 1000, 2) if latencies else None
+
+        return {
+            "model_id": self.agent.model_id,
+            "uptime_s": round(time.time() - self.started, 1),
+            "load_s": self.load_seconds,
+            "requests": self.requests,
+            "texts": self.texts,
+            "batches": self.batches,
+            "errors": self.errors,
+            "queue_depth": self._pending_texts,
+            "avg_batch": round(sum(self._batch_sizes) / len(self._batch_sizes), 2)
+            if self._batch_sizes else None,
+            "latency_ms_p50": percentile(0.5),
+            "latency_ms_p95": percentile(0.95),
+            "latency_ms_max": percentile(1.0),
+        }
+
+    # ------------------------------------------------------
+    # 🚀 Serve
+    # ------------------------------------------------------
+    async def serve(self):
+        start = time.perf_counter()
+        await asyncio.to_thread(lambda: self.agent.backend)
+        self.load_seconds = round(time.perf_counter() - start, 2)
+        print(f"🔥 {self.agent.model_id} ready in {self.load_seconds:.2f}s")
+
+        self._queue = asyncio.Queue()
+        batcher = asyncio.ensure_future(self._batch_loop())
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            if os.path.dirname(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+            if os.path.exists(target):
+                # Stale socket from a previous run (a live server would answer)
+                try:
+                    SentimentClient(self.address, timeout=1).ping()
+                    raise RuntimeError(f"A sentiment server is already running on {target}")
+                except OSError:
+                    os.unlink(target)
+            server = await asyncio.start_unix_server(self._handle, target, limit=MAX_LINE)
+        else:
+            server = await asyncio.start_server(self._handle, *target, limit=MAX_LINE)
+
+        print(f"🧠 Sentiment server listening on {self.address} "
+              f"(batch ≤ {self.max_batch}, wait ≤ {self.max_wait * 1000:.0f} ms)")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            batcher.cancel()
+            if kind == "unix" and os.path.exists(target):
+                os.unlink(target)
+
+
+class SentimentClient:
+    """
+    Blocking client for SentimentServer; one short-lived connection per
+    call, so it is safe to share between threads and forked workers.
+    Raises OSError (incl. ConnectionError, socket.timeout) when the server
+    is unreachable and RuntimeError when it answers with an error.
+    """
+
+    def __init__(self, address=None, timeout=60):
+        self.address = address or SENTIMENT_SOCKET
+        self.timeout = timeout
+
+    def _call(self, request):
+        kind, target = parse_address(self.address)
+        if kind == "unix":
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(target)
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as reader:
+                line = reader.readline()
+        finally:
+            sock.close()
+        if not line:
+            raise ConnectionError("sentiment server closed the connection")
+        response = json.loads(line)
+        if "error" in response:
+            raise RuntimeError(response["error"])
+        return response
+
+    def predict(self, texts, model_id=None):
+        """[(label, confidence, probs)] in input order, like DecisionAgent._predict()."""
+        results = self._call({"texts": list(texts), "model_id": model_id})["results"]
+        return [tuple(r) for r in results]
+
+    def ping(self):
+        return self._call({"op": "ping"})["model_id"]
+
+    def stats(self):
+        return self._call({"op": "stats"})["stats"]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local FinBERT inference server")
+    parser.add_argument("--address", default=os.getenv("SARVA_SENTIMENT_SERVER", SENTIMENT_SOCKET),
+                        help="Unix socket path or host:port (default: %(default)s)")
+    parser.add_argument("--backend", choices=["eager", "int8", "onnx"],
+                        help="Sentiment inference backend (default: eager)")
+    parser.add_argument("--max-batch", type=int, default=64,
+                        help="Texts per micro-batch")
+    parser.add_argument("--max-wait-ms", type=float, default=10,
+                        help="Longest a request waits for its batch to fill")
+    parser.add_argument("--stats", action="store_true",
+                        help="Print a running server's stats and exit")
+    args = parser.parse_args()
+
+    if args.stats:
+        print(json.dumps(SentimentClient(args.address, timeout=5).stats(), indent=2))
+    else:
+        try:
+            asyncio.run(SentimentServer(args.address, args.backend, args.max_batch,
+                                        args.max_wait_ms / 1000).serve())
+        except KeyboardInterrupt:
+            print("👋 Sentiment server stopped.")
@@ -9,7 +9,9 @@ setup(
         'numpy==1.26.4',
         'yfinance==0.2.43',
         'requests==2.32.3',
+        'aiohttp==3.10.5',
         'beautifulsoup4==4.12.3',
+        'lxml==5.3.0',
         'newspaper3k==0.2.8',
         'torch==2.4.1',
         'transformers==4.44.2',
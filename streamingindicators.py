@@ -0,0 +1,225 @@
+# streamingindicators.py
+import copy
+import json
+import math
+import os
+from collections import deque
+
+INDICATOR_STATE_FILE = "data/indicator_state.json"
+
+NAN = float("nan")
+
+
+class RollingMean:
+    """Running-sum simple moving average; O(1) per update."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self._since_resum = 0
+
+    def update(self, x):
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+
+        # Re-sum once per window to stop floating-point drift (amortized O(1))
+        self._since_resum += 1
+        if self._since_resum >= self.window:
+            self.total = math.fsum(self.values)
+            self._since_resum = 0
+
+        return self.total / self.window if len(self.values) == self.window else NAN
+
+    def to_dict(self):
+        return {"window": self.window, "values": list(self.values), "total": self.total}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["window"])
+        obj.values = deque(data["values"])
+        obj.total = data["total"]
+        return obj
+
+
+class SeededEMA:
+    """EMA seeded with the SMA of its first `span` inputs (pandas_ta convention)."""
+
+    def __init__(self, span):
+        self.span = span
+        self.alpha = 2.0 / (span + 1)
+        self.seed = []
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.seed.append(x)
+            if len(self.seed) < self.span:
+                return NAN
+            self.value = sum(self.seed) / self.span
+            self.seed = []
+        else:
+            self.value = self.alpha * x + (1 - self.alpha) * self.value
+        return self.value
+
+    def to_dict(self):
+        return {"span": self.span, "seed": self.seed, "value": self.value}
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls(data["span"])
+        obj.seed = list(data["seed"])
+        obj.value = data["value"]
+        return obj
+
+
+class IndicatorState:
+    """
+    Incremental MA20, MA50, RSI(14) and MACD(12,26,9) for one
+    (ticker, timeframe), following the same formulas as TechnicalAgent.analyze.
+    """
+
+    def __init__(self):
+        self.ma20 = RollingMean(20)
+        self.ma50 = RollingMean(50)
+        self.avg_gain = RollingMean(14)
+        self.avg_loss = RollingMean(14)
+        self.ema_fast = SeededEMA(12)
+        self.ema_slow = SeededEMA(26)
+        self.ema_signal = SeededEMA(9)
+        self.prev_close = None
+        self.last_ts = None
+        self.latest = {}
+
+    def update(self, close, ts=None):
+        # First bar has no delta and counts as a zero move, as in analyze()
+        delta = close - self.prev_close if self.prev_close is not None else 0.0
+        avg_gain = self.avg_gain.update(delta if delta > 0 else 0.0)
+        avg_loss = self.avg_loss.update(-delta if delta < 0 else 0.0)
+        if math.isnan(avg_gain) or (avg_gain == 0 and avg_loss == 0):
+            rsi = NAN
+        elif avg_loss == 0:
+            rsi = 100.0
+        else:
+            rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+
+        fast = self.ema_fast.update(close)
+        slow = self.ema_slow.update(close)
+        macd = fast - slow
+        signal = self.ema_signal.update(macd) if not math.isnan(macd) else NAN
+
+        self.prev_close = close
+        self.last_ts = ts
+        self.latest = {
+            "close": close,
+            "ma20": self.ma20.update(close),
+            "ma50": self.ma50.update(close),
+            "rsi": rsi,
+            "macd": macd,
+            "signal": signal,
+        }
+        return self.latest
+
+    def peek(self, close, ts=None):
+        """Indicators as if `close` were appended, without changing state."""
+        return copy.deepcopy(self).update(close, ts)
+
+    def to_dict(self):
+        return {
+            "ma20": self.ma20.to_dict(),
+            "ma50": self.ma50.to_dict(),
+            "avg_gain": self.avg_gain.to_dict(),
+            "avg_loss": self.avg_loss.to_dict(),
+            "ema_fast": self.ema_fast.to_dict(),
+            "ema_slow": self.ema_slow.to_dict(),
+            "ema_signal": self.ema_signal.to_dict(),
+            "prev_close": self.prev_close,
+            "last_ts": self.last_ts,
+            "latest": self.latest,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        obj = cls()
+        for name in ("ma20", "ma50", "avg_gain", "avg_loss"):
+            setattr(obj, name, RollingMean.from_dict(data[name]))
+        for name in ("ema_fast", "ema_slow", "ema_signal"):
+            setattr(obj, name, SeededEMA.from_dict(data[name]))
+        obj.prev_close = data["prev_close"]
+        obj.last_ts = data["last_ts"]
+        obj.latest = data["latest"]
+        return obj
+
+
+class StreamingIndicatorEngine:
+    """
+    Keeps one IndicatorState per (ticker, timeframe). Closed bars are folded
+    into the state once; the newest (possibly still forming) bar is only
+    previewed, so it can be re-read with its final values next time.
+
+    EMAs carry memory from the first bar ever seen, while the batch
+    implementation seeds at the start of its 30/180-day window; the seed's
+    weight decays geometrically, so both agree to float tolerance once a few
+    hundred bars have passed.
+    """
+
+    def __init__(self, state_path=INDICATOR_STATE_FILE):
+        self.state_path = state_path
+        self.states = {}
+
+    @staticmethod
+    def _key(ticker, timeframe):
+        return f"{ticker.upper()}|{timeframe}"
+
+    def update(self, ticker, timeframe, candles):
+        """
+        Feed a DataFrame of bars (CandleCache.get output). Returns the latest
+        indicator values, or None if there are no bars.
+        """
+        if candles is None or candles.empty:
+            return None
+
+        timestamps = [int(ts.timestamp()) for ts in candles.index]
+        closes = [float(c) for c in candles["Close"]]
+        key = self._key(ticker, timeframe)
+        state = self.states.get(key)
+
+        # Missing bars between the saved state and this window: start over
+        if state is None or (state.last_ts is not None and state.last_ts < timestamps[0]):
+            state = IndicatorState()
+            self.states[key] = state
+
+        last_ts = state.last_ts if state.last_ts is not None else -1
+        for ts, close in zip(timestamps[:-1], closes[:-1]):
+            if ts > last_ts:
+                state.update(close, ts)
+
+        if timestamps[-1] > last_ts:
+            return state.peek(closes[-1], timestamps[-1])
+        return state.latest
+
+    # ------------------------------------------------------
+    # 💾 Persistence between runs
+    # ------------------------------------------------------
+    def save(self):
+        if os.path.dirname(self.state_path):
+            os.makedirs(os.path.dirname(self.state_path), exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({k: s.to_dict() for k, s in self.states.items()}, f)
+        os.replace(tmp_path, self.state_path)
+
+    @classmethod
+    def load(cls, state_path=INDICATOR_STATE_FILE):
+        engine = cls(state_path)
+        if os.path.exists(state_path):
+            try:
+                with open(state_path, encoding="utf-8") as f:
+                    data = json.load(f)
+                engine.states = {k: IndicatorState.from_dict(v)
+                                 for k, v in data.items()}
+            except Exception as e:
+                print(f"⚠️ Failed to load indicator state, starting fresh: {e}")
+        return engine
@@ -1,13 +1,17 @@
 # technicalagent.py
-import yfinance as yf
 import pandas as pd
 import numpy as np
 import pandas_ta as ta
+import indicators
+from candlecache import get_candle_cache
+from streamingindicators import StreamingIndicatorEngine
 
 
 class TechnicalAgent:
-    def __init__(self, debug: bool = False):
+    def __init__(self, debug: bool = False, candle_cache=None, indicator_engine=None):
         self.debug = debug
+        self.candle_cache = candle_cache or get_candle_cache()
+        self.indicator_engine = indicator_engine
 
     def sanitize_ticker(self, coin: str) -> str:
         """
@@ -32,18 +36,20 @@ class TechnicalAgent:
 
         return f"{coin}-USD"
 
+    @staticmethod
+    def history_period(timeframe: str) -> str:
+        return "30d" if "h" in timeframe else "180d"
+
     def analyze(self, coin: str, timeframe: str = "4h"):
         ticker = self.sanitize_ticker(coin)
-        period = "30d" if "h" in timeframe else "180d"
+        period = self.history_period(timeframe)
 
         if self.debug:
             print(
                 f"\n📊 Performing technical analysis for {ticker} ({timeframe})...")
 
         try:
-            data = yf.download(
-                ticker, period=period, interval=timeframe, progress=False
-            )
+            data = self.candle_cache.get(ticker, timeframe, period)
         except Exception as e:
             print(f"⚠️ Failed to fetch data for {ticker}: {e}")
             return "UNKNOWN", 0, timeframe, "No data"
@@ -61,8 +67,8 @@ class TechnicalAgent:
             delta = data["Close"].diff()
             gain = np.where(delta > 0, delta, 0)
             loss = np.where(delta < 0, -delta, 0)
-            avg_gain = pd.Series(gain.flatten()).rolling(14).mean()
-            avg_loss = pd.Series(loss.flatten()).rolling(14).mean()
+            avg_gain = pd.Series(gain, index=data.index).rolling(14).mean()
+            avg_loss = pd.Series(loss, index=data.index).rolling(14).mean()
             rs = avg_gain / avg_loss
             data["RSI"] = 100 - (100 / (1 + rs))
 
@@ -87,6 +93,10 @@ class TechnicalAgent:
         macd_val = float(latest["MACD"].iloc[0])
         signal = float(latest["Signal"].iloc[0])
 
+        return self.interpret(close, ma20, ma50, rsi, macd_val, signal, timeframe)
+
+    def interpret(self, close, ma20, ma50, rsi, macd_val, signal, timeframe):
+        """Turn the latest indicator values into (bias, strength, timeframe, reason)."""
         if self.debug:
             print(f"🔹 Close: {close}")
             print(f"🔹 MA20: {ma20}")
@@ -122,3 +132,91 @@ class TechnicalAgent:
             print(f"📘 Reason: {'; '.join(reason)}")
 
         return bias, strength, timeframe, "; ".join(reason)
+
+    # ------------------------------------------------------
+    # 📦 Batch mode: one panel, every coin at once
+    # ------------------------------------------------------
+    def analyze_batch(self, coins, timeframe: str = "4h", chunk_size: int = 50,
+                      return_panel: bool = False):
+        """
+        Analyze many coins with grouped downloads and column-wise indicators.
+        Returns {coin: (bias, strength, timeframe, reason)} with the same
+        tuples analyze() produces; with return_panel=True also returns the
+        right-aligned close panel and its {coin: column} mapping.
+        """
+        tickers = {coin: self.sanitize_ticker(coin) for coin in coins}
+        period = self.history_period(timeframe)
+
+        if self.debug:
+            print(f"\n📊 Batch technical analysis for {len(tickers)} coins ({timeframe})...")
+
+        try:
+            frames = self.candle_cache.get_many(
+                tickers.values(), timeframe, period, chunk_size)
+        except Exception as e:
+            print(f"⚠️ Batch download failed: {e}")
+            frames = {}
+
+        columns = list(dict.fromkeys(
+            t for t in tickers.values() if t in frames and not frames[t].empty))
+        position = {ticker: j for j, ticker in enumerate(columns)}
+        closes = indicators.right_align(
+            [frames[t]["Close"].to_numpy() for t in columns])
+
+        if columns:
+            macd_line, signal_line = indicators.macd(closes, 12, 26, 9)
+            latest = {
+                "close": closes[-1],
+                "ma20": indicators.sma(closes, 20)[-1],
+                "ma50": indicators.sma(closes, 50)[-1],
+                "rsi": indicators.rsi(closes, 14)[-1],
+                "macd": macd_line[-1],
+                "signal": signal_line[-1],
+            }
+
+        results = {}
+        for coin, ticker in tickers.items():
+            if ticker not in position:
+                if self.debug:
+                    print(f"⚠️ No data found for {ticker} {timeframe}")
+                results[coin] = ("UNKNOWN", 0, timeframe, "No data")
+                continue
+            j = position[ticker]
+            results[coin] = self.interpret(
+                float(latest["close"][j]), float(latest["ma20"][j]),
+                float(latest["ma50"][j]), float(latest["rsi"][j]),
+                float(latest["macd"][j]), float(latest["signal"][j]), timeframe)
+
+        if return_panel:
+            return results, closes, {c: position[t] for c, t in tickers.items() if t in position}
+        return results
+
+    # ------------------------------------------------------
+    # 🔁 Streaming mode: O(1) indicator updates per new bar
+    # ------------------------------------------------------
+    def analyze_streaming(self, coin: str, timeframe: str = "4h", save_state: bool = True):
+        """
+        Same result as analyze(), but only bars newer than the stored
+        indicator state are processed. State persists between runs via
+        StreamingIndicatorEngine.save().
+        """
+        if self.indicator_engine is None:
+            self.indicator_engine = StreamingIndicatorEngine.load()
+
+        ticker = self.sanitize_ticker(coin)
+        try:
+            data = self.candle_cache.get(
+                ticker, timeframe, self.history_period(timeframe))
+        except Exception as e:
+            print(f"⚠️ Failed to fetch data for {ticker}: {e}")
+            return "UNKNOWN", 0, timeframe, "No data"
+
+        latest = self.indicator_engine.update(ticker, timeframe, data)
+        if latest is None:
+            print(f"⚠️ No data found for {ticker} {timeframe}")
+            return "UNKNOWN", 0, timeframe, "No data"
+        if save_state:
+            self.indicator_engine.save()
+
+        return self.interpret(latest["close"], latest["ma20"], latest["ma50"],
+                              latest["rsi"], latest["macd"], latest["signal"], timeframe)
@@ -0,0 +1,21 @@
+from articleindex import ArticleIndex, content_hash
+
+
+def test_consumed_state_is_per_consumer(tmp_path):
+    index = ArticleIndex(str(tmp_path / "index.db"))
+    url, text = "https://coinjournal.net/news/", "shared tag page text"
+    index.record(url, text, etag='"v1"')
+
+    # Fetching a shared page does not make it processed for anyone
+    assert index.filter_new([url], consumer="BTC") == [url]
+    assert index.conditional_headers(url, consumer="BTC") == {}
+
+    index.mark_consumed("BTC", [(url, content_hash(text))])
+    assert index.filter_new([url], consumer="BTC") == []
+    assert index.conditional_headers(url, consumer="BTC") == {"If-None-Match": '"v1"'}
+    assert index.filter_new([url], consumer="ETH") == [url]
+    assert index.conditional_headers(url, consumer="ETH") == {}
+
+    # New content at the same URL needs a fresh (unconditional) fetch
+    index.record(url, "updated tag page text", etag='"v2"')
+    assert index.conditional_headers(url, consumer="BTC") == {}
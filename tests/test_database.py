@@ -0,0 +1,36 @@
+import pytest
+
+from database import Database
+from databaseagent import DatabaseAgent
+
+
+def test_failed_flush_keeps_rows(tmp_path):
+    db = Database(str(tmp_path / "data.db"), flush_interval=3600)
+    db.save_technical("btc", "4h", "BULLISH", 0.7, "trend")
+    db.conn.execute("ALTER TABLE technical_analysis RENAME TO technical_moved")
+
+    with pytest.raises(Exception):
+        db.flush()
+    assert len(db._pending["technical_analysis"]) == 1
+
+    db.conn.execute("ALTER TABLE technical_moved RENAME TO technical_analysis")
+    db.flush()
+    rows = db.conn.execute("SELECT coin, bias FROM technical_analysis").fetchall()
+    assert rows == [("BTC", "BULLISH")]
+    assert db._pending["technical_analysis"] == []
+    db.close()
+
+
+def test_databaseagent_failed_flush_keeps_rows(tmp_path):
+    agent = DatabaseAgent(str(tmp_path / "news.db"), flush_interval=0)
+    agent.conn.execute("ALTER TABLE news_analysis RENAME TO news_moved")
+
+    # The auto-flush on save logs instead of raising
+    agent.save_analysis("eth", "https://a", {"action": "LONG"}, "positive", "BULLISH", "4h", "t")
+    assert len(agent._pending) == 1
+
+    agent.conn.execute("ALTER TABLE news_moved RENAME TO news_analysis")
+    agent.flush()
+    assert agent.query_report(coin="eth")[0][1:4] == ("ETH", "positive", "LONG")
+    assert agent._pending == []
+    agent.close()
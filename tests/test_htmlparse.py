@@ -0,0 +1,11 @@
+import pytest
+
+import htmlparse
+
+
+@pytest.mark.skipif(not htmlparse.HAS_LXML, reason="lxml not installed")
+def test_bare_xml_declaration_parses_to_nothing():
+    html = '<?xml version="1.0" encoding="utf-8"?>'
+    assert htmlparse.links(html) == []
+    assert htmlparse.paragraph_text(html) == ""
+    assert htmlparse.title_and_description(html) == (None, None)
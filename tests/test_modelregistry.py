@@ -0,0 +1,50 @@
+import sys
+import threading
+import types
+
+import modelregistry
+from modelregistry import ModelRegistry
+
+
+def _get_in_thread(registry, name, timeout=3):
+    result = {}
+    worker = threading.Thread(
+        target=lambda: result.setdefault("value", registry.get(name)), daemon=True)
+    worker.start()
+    worker.join(timeout)
+    assert not worker.is_alive(), f"registry.get({name!r}) deadlocked"
+    return result["value"]
+
+
+def test_int8_loads_lazily_from_cold_registry(monkeypatch):
+    registry = ModelRegistry()
+    registry.register("finbert", lambda: ("fp32-model", "tokenizer"))
+    registry.register("finbert-int8", modelregistry._load_finbert_int8)
+    monkeypatch.setattr(modelregistry, "registry", registry)
+
+    fake_backend = types.ModuleType("inferencebackend")
+    fake_backend.quantize_int8 = lambda model: f"int8({model})"
+    monkeypatch.setitem(sys.modules, "inferencebackend", fake_backend)
+
+    assert not registry.is_loaded("finbert")
+    assert _get_in_thread(registry, "finbert-int8") == ("int8(fp32-model)", "tokenizer")
+    # The fp32 model it quantized is shared, not loaded twice
+    assert registry.is_loaded("finbert")
+
+
+def test_concurrent_gets_load_once():
+    calls = []
+    barrier = threading.Barrier(4)
+    registry = ModelRegistry()
+    registry.register("model", lambda: calls.append(1) or "loaded")
+
+    def get():
+        barrier.wait()
+        registry.get("model")
+
+    threads = [threading.Thread(target=get) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(3)
+    assert calls == [1]
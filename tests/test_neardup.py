@@ -0,0 +1,19 @@
+from neardup import NearDuplicateIndex
+
+
+def test_load_keeps_signatures_with_threshold_override(tmp_path):
+    path = str(tmp_path / "index.npz")
+    index = NearDuplicateIndex()
+    index.add("https://a", "bitcoin breaks above resistance as traders pile into futures")
+    index.save(path)
+
+    loaded = NearDuplicateIndex.load(path, threshold=0.9)
+    assert list(loaded.signatures) == ["https://a"]
+    assert loaded.threshold == 0.9
+    assert NearDuplicateIndex.load(path).threshold == index.threshold
+
+
+def test_load_corrupt_file_starts_fresh(tmp_path):
+    path = tmp_path / "index.npz"
+    path.write_bytes(b"not an npz file")
+    assert len(NearDuplicateIndex.load(str(path)).signatures) == 0
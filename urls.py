@@ -30,3 +30,49 @@ COIN_URLS = {
         "https://coinjournal.net/news/",
     ],
 }
+
+# Names (matched case-insensitively) and tickers (matched as written) that
+# route an article to a coin
+COIN_ALIASES = {
+    "BTC": {"names": ["bitcoin", "bitcoins"], "tickers": ["BTC", "XBT"]},
+    "ETH": {"names": ["ethereum", "ether"], "tickers": ["ETH"]},
+    "BNB": {"names": ["binance coin", "bnb chain", "bnb smart chain"], "tickers": ["BNB"]},
+    "SOL": {"names": ["solana"], "tickers": ["SOL"]},
+    "ADA": {"names": ["cardano"], "tickers": ["ADA"]},
+}
+
+# RSS/Atom feeds and news sitemaps per coin for feed ingestion (--feeds).
+# Site-wide feeds are fine: NewsCorpus routes articles to the coins they
+# mention, and FeedIngestor(coin=...) keeps only articles mentioning the coin.
+COIN_FEEDS = {
+    "BTC": [
+        "https://cointelegraph.com/rss/tag/bitcoin",
+        "https://www.coindesk.com/arc/outboundfeeds/rss/",
+        "https://crypto.news/tag/btc/feed/",
+        "https://coinjournal.net/news/feed/",
+    ],
+    "ETH": [
+        "https://cointelegraph.com/rss/tag/ethereum",
+        "https://www.coindesk.com/arc/outboundfeeds/rss/",
+        "https://crypto.news/tag/eth/feed/",
+        "https://coinjournal.net/news/feed/",
+    ],
+    "BNB": [
+        "https://cointelegraph.com/rss/tag/binance-coin",
+        "https://www.coindesk.com/arc/outboundfeeds/rss/",
+        "https://crypto.news/tag/bnb/feed/",
+        "https://coinjournal.net/news/feed/",
+    ],
+    "SOL": [
+        "https://cointelegraph.com/rss/tag/solana",
+        "https://www.coindesk.com/arc/outboundfeeds/rss/",
+        "https://crypto.news/tag/sol/feed/",
+        "https://coinjournal.net/news/feed/",
+    ],
+    "ADA": [
+        "https://cointelegraph.com/rss/tag/cardano",
+        "https://www.coindesk.com/arc/outboundfeeds/rss/",
+        "https://crypto.news/tag/ada/feed/",
+        "https://coinjournal.net/news/feed/",
+    ],
+}